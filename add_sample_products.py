@@ -1,15 +1,15 @@
-from app import mongo
-from bson import ObjectId
+import sys
+from app import create_app
+from app.importer import import_products
 
-def add_sample_products():
-    try:
-        # Clear existing products
-        mongo.db.products.delete_many({})
-        print("Cleared existing products")
+SAMPLE_VENDOR = 'vendor@example.com'
 
+def add_sample_products(vendor_email=SAMPLE_VENDOR):
+    try:
         # Sample products with local image paths
         products = [
             {
+                'sku': 'SAMPLE-001',
                 'name': 'Premium Wireless Headphones',
                 'description': 'High-quality wireless headphones with noise cancellation',
                 'price': 199.99,
@@ -18,6 +18,7 @@ def add_sample_products():
                 'images': ['/static/images/Premium Wireless Headphones.png']
             },
             {
+                'sku': 'SAMPLE-002',
                 'name': 'Smart Fitness Watch',
                 'description': 'Track your fitness goals with this advanced smartwatch',
                 'price': 149.99,
@@ -26,6 +27,7 @@ def add_sample_products():
                 'images': ['/static/images/Smart Fitness Watch.png']
             },
             {
+                'sku': 'SAMPLE-003',
                 'name': 'Organic Cotton T-Shirt',
                 'description': 'Comfortable and eco-friendly cotton t-shirt',
                 'price': 29.99,
@@ -34,6 +36,7 @@ def add_sample_products():
                 'images': ['/static/images/Organic Cotton T-Shirt.png']
             },
             {
+                'sku': 'SAMPLE-004',
                 'name': 'Professional Chef Knife',
                 'description': 'High-quality chef knife for professional cooking',
                 'price': 89.99,
@@ -42,6 +45,7 @@ def add_sample_products():
                 'images': ['/static/images/ProfessionalChefKnife.png']
             },
             {
+                'sku': 'SAMPLE-005',
                 'name': 'Leather Messenger Bag',
                 'description': 'Stylish and durable leather messenger bag',
                 'price': 129.99,
@@ -51,12 +55,16 @@ def add_sample_products():
             }
         ]
 
-        # Insert products
-        result = mongo.db.products.insert_many(products)
-        print(f"Added {len(result.inserted_ids)} products")
+        # Upsert by SKU through the bulk importer, so re-running updates instead of duplicating
+        rows = ((i, product, None) for i, product in enumerate(products, 1))
+        stats = import_products(rows, vendor_email,
+                                on_error=lambda row, sku, message: print(f"Product {sku}: {message}"))
+        print(f"Added {stats['inserted']} products, updated {stats['updated']}")
 
     except Exception as e:
         print(f"Error adding products: {str(e)}")
 
 if __name__ == '__main__':
-    add_sample_products() 
\ No newline at end of file
+    # Creates the vendor_sku_unique index the upserts are keyed on
+    create_app()
+    add_sample_products(*sys.argv[1:2]) 
\ No newline at end of file
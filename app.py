@@ -1,13 +1,12 @@
-from app import app
-
-if __name__ == '__main__':
-    print("Starting Flask application...")
-    print(f"Static folder: {app.static_folder}")
-    print(f"Template folder: {app.template_folder}")
-    app.run(debug=True, port=5001)
-
+import os
+from app import create_app
 
+# Development server with the debugger and reloader. In production run the WSGI entry
+# point with gunicorn instead: gunicorn -c gunicorn.conf.py
+app = create_app()
 
-
-
-    
\ No newline at end of file
+if __name__ == '__main__':
+    app.logger.info("Starting Flask application...")
+    app.logger.info("Static folder: %s", app.static_folder)
+    app.logger.info("Template folder: %s", app.template_folder)
+    app.run(debug=os.getenv('FLASK_DEBUG', 'true').lower() == 'true', port=int(os.getenv('PORT', 5001)))
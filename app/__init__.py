@@ -1,11 +1,11 @@
-from flask import Flask, render_template, send_from_directory, jsonify
+from flask import Flask, Response, render_template, jsonify, request
 from flask_pymongo import PyMongo
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_login import LoginManager, current_user
 from dotenv import load_dotenv
+import logging
 import os
-import traceback
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +18,14 @@ app = Flask(__name__,
             static_folder=os.path.join(app_dir, 'static'),
             template_folder=os.path.join(app_dir, 'templates'))
 
+# JSON encoding of ObjectId and datetime, via orjson when it is installed
+from app.json_provider import MongoJSONProvider
+app.json = MongoJSONProvider(app)
+
+# Leveled logging (LOG_LEVEL, LOG_LEVELS); records are written by a background listener
+from app import logging_config
+logger = logging.getLogger(__name__)
+
 # Configure MongoDB with proper settings
 app.config["MONGO_URI"] = os.getenv("MONGODB_URI", "mongodb://localhost:27017/mve_db")
 app.config["MONGO_CONNECT"] = False  # Prevent connection on app creation
@@ -28,8 +36,83 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 
-# Initialize MongoDB
-mongo = PyMongo(app)
+# Request timing and Mongo command metrics, served on /metrics
+from app.metrics import mongo_command_listener, render_metrics
+
+# Connection pool bounds apply per process, so size them for one worker's threads
+app.config['MONGO_MAX_POOL_SIZE'] = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+app.config['MONGO_MIN_POOL_SIZE'] = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+# Close pooled connections idle this long (0 keeps them open)
+app.config['MONGO_MAX_IDLE_TIME_MS'] = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000))
+app.config['MONGO_CONNECT_TIMEOUT_MS'] = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'] = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+# Wire compression, in order of preference, e.g. "zstd,snappy,zlib" (zstd and snappy need
+# the zstandard / python-snappy packages); empty leaves traffic uncompressed
+app.config['MONGO_COMPRESSORS'] = os.getenv('MONGO_COMPRESSORS', '')
+# Product search and the featured ranking may read from secondaries (reads cached under a
+# catalog version stay on the primary, so a cached page is never older than its version)
+app.config['MONGO_CATALOG_READ_PREFERENCE'] = os.getenv('MONGO_CATALOG_READ_PREFERENCE', 'secondaryPreferred')
+# Skip secondaries lagging more than this many seconds (at least 90; -1 for no limit)
+app.config['MONGO_CATALOG_MAX_STALENESS'] = int(os.getenv('MONGO_CATALOG_MAX_STALENESS', 90))
+# Create any missing indexes in create_app() (idempotent; set MONGO_ENSURE_INDEXES=false to skip)
+app.config['MONGO_ENSURE_INDEXES'] = os.getenv('MONGO_ENSURE_INDEXES', 'true').lower() == 'true'
+
+# Initialize MongoDB. The client connects lazily, so nothing touches the network until
+# the first query; see create_app() for what happens on fork.
+mongo = PyMongo()
+
+def init_mongo():
+    """(Re)create the Mongo client from app.config."""
+    options = {}
+    if app.config['MONGO_COMPRESSORS']:
+        options['compressors'] = app.config['MONGO_COMPRESSORS']
+    if app.config['MONGO_MAX_IDLE_TIME_MS']:
+        options['maxIdleTimeMS'] = app.config['MONGO_MAX_IDLE_TIME_MS']
+    mongo.init_app(app, maxPoolSize=app.config['MONGO_MAX_POOL_SIZE'],
+                   minPoolSize=app.config['MONGO_MIN_POOL_SIZE'],
+                   connectTimeoutMS=app.config['MONGO_CONNECT_TIMEOUT_MS'],
+                   serverSelectionTimeoutMS=app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+                   event_listeners=[mongo_command_listener], **options)
+
+init_mongo()
+
+# A client used before fork (e.g. by create_app() in a preloading gunicorn master) shares
+# sockets and monitor threads with the parent; each child opens its own on first use.
+os.register_at_fork(after_in_child=init_mongo)
+
+# In-process cache for catalog reads (single products and listing pages)
+from app.cache import TTLCache
+app.config['CATALOG_CACHE_SIZE'] = int(os.getenv('CATALOG_CACHE_SIZE', 2048))
+app.config['CATALOG_CACHE_TTL'] = float(os.getenv('CATALOG_CACHE_TTL', 60))
+app.config['CATALOG_CACHE_STALE_TTL'] = float(os.getenv('CATALOG_CACHE_STALE_TTL', 300))
+catalog_cache = TTLCache(max_size=app.config['CATALOG_CACHE_SIZE'],
+                         ttl=app.config['CATALOG_CACHE_TTL'],
+                         stale_ttl=app.config['CATALOG_CACHE_STALE_TTL'])
+
+# Short-lived cache of verified identities so authenticated requests skip the users lookup.
+# Entries are never served stale; role changes and deletions apply within the TTL.
+app.config['IDENTITY_CACHE_SIZE'] = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+app.config['IDENTITY_CACHE_TTL'] = float(os.getenv('IDENTITY_CACHE_TTL', 30))
+identity_cache = TTLCache(max_size=app.config['IDENTITY_CACHE_SIZE'],
+                          ttl=app.config['IDENTITY_CACHE_TTL'],
+                          stale_ttl=0)
+
+# Fingerprint static files and precompress CSS/JS (flask build-assets does the same at deploy time)
+from app.assets import static_assets, send_static_asset
+if app.config['STATIC_FINGERPRINT']:
+    try:
+        static_assets.build()
+    except Exception as e:
+        logger.error("Error fingerprinting static assets: %s", e)
+
+# gzip/brotli-compress JSON and HTML responses (COMPRESS_LEVEL, COMPRESS_MIN_SIZE)
+from app import compression
+
+# Per-endpoint Mongo time budgets (MONGO_QUERY_TIMEOUT_MS); timeouts become 503 + Retry-After
+from app.query_budget import is_query_timeout, retry_after_headers
+
+# Background Mongo pinger behind /readyz
+from app.health import mongo_pinger
 
 # Configure JWT
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "your-secret-key")
@@ -39,85 +122,123 @@ jwt = JWTManager(app)
 CORS(app)
 
 # Import routes
-from app.routes import auth_routes, product_routes, order_routes, cart_routes
+from app.routes import auth_routes, product_routes, order_routes, cart_routes, vendor_routes, admin_routes
 
 # Register blueprints
 app.register_blueprint(auth_routes.bp, url_prefix='/api/auth')
 app.register_blueprint(product_routes.bp, url_prefix='/api/products')
 app.register_blueprint(order_routes.bp, url_prefix='/api/orders')
 app.register_blueprint(cart_routes.cart, url_prefix='/api/cart')
+app.register_blueprint(vendor_routes.bp, url_prefix='/api/vendor')
+app.register_blueprint(admin_routes.bp, url_prefix='/api/admin')
+
+# Register CLI commands (flask ensure-indexes, flask index-stats)
+from app import commands
 
 # Add current_user to template context
 @app.context_processor
 def inject_user():
     return dict(current_user=current_user)
 
-# Test MongoDB connection route
+# Liveness: the process is up and serving requests; never touches the database
+@app.route('/healthz')
+def healthz():
+    response = jsonify({'status': 'ok'})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Readiness: answered from the background pinger's last result, not a new round trip.
+# /test-db is kept for probes that still use it; database stats are at /api/admin/db-stats.
+@app.route('/readyz')
 @app.route('/test-db')
-def test_db():
-    try:
-        # Test MongoDB connection
-        mongo.db.command('ping')
-        
-        # Get database info
-        db_info = mongo.db.command('dbStats')
-        
-        return jsonify({
-            'status': 'success',
-            'message': 'MongoDB connection successful',
-            'database': {
-                'name': db_info['db'],
-                'collections': list(mongo.db.list_collection_names()),
-                'size': db_info['dataSize']
-            }
-        })
-    except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': 'MongoDB connection failed',
-            'error': str(e)
-        }), 500
+def readyz():
+    mongo_pinger.ensure_started()
+    ready, ping = mongo_pinger.status()
+    response = jsonify({'status': 'ready' if ready else 'unavailable', 'mongo': ping})
+    response.headers['Cache-Control'] = 'no-store'
+    if not ready:
+        response.status_code = 503
+        response.headers.update(retry_after_headers())
+    return response
+
+# Prometheus text-format metrics
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+_created = False
+
+def create_app(config=None):
+    """Finish setting up the app for this process and return it.
+
+    `config` is a mapping of overrides for app.config; Mongo client settings in it
+    (MONGO_URI, pool sizes) take effect here. Settings other modules read at
+    import, like cache sizes, come from the environment. The first call also
+    creates missing indexes. Servers may call this before forking workers: every
+    forked child gets a fresh Mongo client and log listener.
+    """
+    global _created
+    if config:
+        app.config.update(config)
+        init_mongo()
+    if not _created:
+        _created = True
+        if app.config['MONGO_ENSURE_INDEXES']:
+            from app.indexes import ensure_indexes
+            try:
+                ensure_indexes(mongo.db)
+            except Exception as e:
+                logger.error("Error ensuring indexes: %s", e)
+    return app
 
 # Import models after app initialization to avoid circular imports
 from app.models.user import User
+from app.pagination import parse_page_args, fetch_page, PRODUCT_LIST_PROJECTION
+from app.fragments import render_fragment
+from app.products import serialize_products
 
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        user_data = mongo.db.users.find_one({'_id': user_id})
+        cache_key = ('user', str(user_id))
+        user_data = identity_cache.get_or_load(cache_key, lambda: mongo.db.users.find_one({'_id': user_id}))
         if user_data:
             return User(user_data)
+        # Don't cache misses, so a user created later is found right away
+        identity_cache.invalidate(cache_key)
         return None
     except Exception as e:
-        print(f"Error loading user: {str(e)}")
+        logger.error("Error loading user: %s", e)
         return None
 
 # Root route
 @app.route('/')
 def index():
     try:
-        # Get products for initial page load
-        products = list(mongo.db.products.find())
-        for product in products:
-            product['_id'] = str(product['_id'])
-            # Ensure product has required fields
-            if 'name' not in product:
-                product['name'] = 'Unnamed Product'
-            if 'description' not in product:
-                product['description'] = 'No description available'
-            if 'price' not in product:
-                product['price'] = 0
-            # Handle images
-            if not product.get('images') or len(product['images']) == 0:
-                product['images'] = ['/static/images/default-product.png']
-            elif isinstance(product['images'], str):
-                product['images'] = [product['images']]
+        try:
+            after, limit, sort = parse_page_args(request.args)
+        except ValueError as e:
+            return render_template('index.html', products=[], error=str(e)), 400
+
+        def load_page():
+            # Get the first page of products for initial page load
+            products, next_cursor = fetch_page(mongo.db.products, {}, after=after, limit=limit,
+                                               sort=sort, projection=PRODUCT_LIST_PROJECTION)
+            return serialize_products(products), next_cursor
+        
+        def grid_context():
+            products, next_cursor = load_page()
+            logger.debug("Rendering index with %d products", len(products))
+            return dict(products=products, next_cursor=next_cursor, limit=limit, sort=sort)
         
-        print(f"Rendering index with {len(products)} products")  # Debug print
-        return render_template('index.html', products=products)
+        # Only the page shell is rendered per request; the grid comes from the fragment cache
+        products_html = render_fragment('fragments/index_products.html', (after, limit, sort), grid_context)
+        return render_template('index.html', products_html=products_html)
     except Exception as e:
-        print(f"Error in index route: {str(e)}")  # Debug print
-        print(traceback.format_exc())  # Print full traceback
+        if is_query_timeout(e):
+            return render_template('index.html', products=[], error='The catalog is busy, please retry shortly'), \
+                503, retry_after_headers()
+        logger.exception("Error in index route")
         return render_template('index.html', products=[], error=str(e))
 
 # Vendor dashboard route
@@ -126,7 +247,7 @@ def vendor_dashboard():
     try:
         return render_template('vendor_dashboard.html')
     except Exception as e:
-        print(f"Error rendering vendor dashboard: {str(e)}")
+        logger.exception("Error rendering vendor dashboard")
         return str(e), 500
 
 # Customer dashboard route
@@ -135,7 +256,7 @@ def customer_dashboard():
     try:
         return render_template('customer_dashboard.html')
     except Exception as e:
-        print(f"Error rendering customer dashboard: {str(e)}")
+        logger.exception("Error rendering customer dashboard")
         return str(e), 500
 
 # Cart route
@@ -144,7 +265,7 @@ def cart():
     try:
         return render_template('cart.html')
     except Exception as e:
-        print(f"Error rendering cart: {str(e)}")
+        logger.exception("Error rendering cart")
         return str(e), 500
 
 # Orders route
@@ -153,10 +274,11 @@ def orders():
     try:
         return render_template('orders.html')
     except Exception as e:
-        print(f"Error rendering orders: {str(e)}")
+        logger.exception("Error rendering orders")
         return str(e), 500
 
-# Serve static files
-@app.route('/static/<path:filename>')
+# Serve static files; fingerprinted URLs from url_for('static') are cached for a year
 def serve_static(filename):
-    return send_from_directory(app.static_folder, filename) 
\ No newline at end of file
+    return send_static_asset(filename)
+
+app.view_functions['static'] = serve_static
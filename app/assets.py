@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from flask import request, send_from_directory
+from app import app
+from app.images import VARIANTS_DIR, is_content_hashed
+
+# Brotli is optional: without it CSS/JS are precompressed with gzip only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+app.config['STATIC_FINGERPRINT'] = os.getenv('STATIC_FINGERPRINT', 'true').lower() == 'true'
+app.config['STATIC_BUILD_DIR'] = os.getenv('STATIC_BUILD_DIR', os.path.join(app.root_path, 'static_build'))
+app.config['STATIC_MAX_AGE'] = int(os.getenv('STATIC_MAX_AGE', 365 * 24 * 3600))
+
+MANIFEST_FILE = 'manifest.json'
+PRECOMPRESS_EXTENSIONS = ('.css', '.js')
+# Preferred first when the client accepts both
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def cache_forever(response):
+    """Mark a response whose URL changes whenever its content does."""
+    # send_file marks responses no-cache when no max_age was passed
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def _fingerprinted_name(rel_path, digest):
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class AssetManifest:
+    """Maps static files to content-fingerprinted URLs.
+
+    `build` hashes every file under the static folder and writes gzip (and, when the
+    brotli module is installed, brotli) copies of CSS and JS into the build directory.
+    Fingerprinted names change whenever the content does, so they are served with an
+    immutable, far-future Cache-Control. Files whose size and mtime match the saved
+    manifest are not re-hashed, so rebuilding on every startup is cheap.
+    """
+
+    def __init__(self, static_folder, build_dir):
+        self.static_folder = static_folder
+        self.build_dir = build_dir
+        self._urls = {}        # original path -> fingerprinted path
+        self._originals = {}   # fingerprinted path -> original path
+        self._encodings = {}   # fingerprinted path -> available content encodings
+        self._lock = threading.Lock()
+
+    def _load_saved(self):
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _precompress(self, path, fingerprinted):
+        encodings = []
+        data = None
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            if encoding == 'br' and brotli is None:
+                continue
+            target = os.path.join(self.build_dir, fingerprinted + suffix)
+            if not os.path.exists(target):
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                if encoding == 'br':
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    # mtime=0 keeps the output identical across builds
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                _write_atomic(target, compressed)
+            encodings.append(encoding)
+        return encodings
+
+    def build(self):
+        """Fingerprint the static folder and precompress CSS/JS; returns the file count."""
+        saved = self._load_saved()
+        entries = {}
+        encodings = {}
+        variants_path = os.path.join(self.static_folder, 'images', VARIANTS_DIR)
+        for root, dirs, files in os.walk(self.static_folder):
+            # Generated variants and hashed uploads are already content-addressed
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != variants_path]
+            for name in files:
+                if is_content_hashed(name) or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                stat = os.stat(path)
+                previous = saved.get(rel_path)
+                if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+                    digest = previous['digest']
+                else:
+                    digest = _file_digest(path)
+                fingerprinted = _fingerprinted_name(rel_path, digest)
+                entries[rel_path] = {'digest': digest, 'size': stat.st_size,
+                                     'mtime': stat.st_mtime, 'url': fingerprinted}
+                if name.endswith(PRECOMPRESS_EXTENSIONS):
+                    encodings[fingerprinted] = self._precompress(path, fingerprinted)
+
+        _write_atomic(os.path.join(self.build_dir, MANIFEST_FILE),
+                      json.dumps(entries, indent=2, sort_keys=True).encode('utf-8'))
+        with self._lock:
+            self._urls = {rel_path: entry['url'] for rel_path, entry in entries.items()}
+            self._originals = {entry['url']: rel_path for rel_path, entry in entries.items()}
+            self._encodings = encodings
+        return len(entries)
+
+    def url_path(self, filename):
+        return self._urls.get(filename, filename)
+
+    def original(self, fingerprinted):
+        return self._originals.get(fingerprinted)
+
+    def best_encoding(self, fingerprinted, accept_encodings):
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in self._encodings.get(fingerprinted, ()) and accept_encodings[encoding] > 0:
+                return encoding
+        return None
+
+static_assets = AssetManifest(app.static_folder, app.config['STATIC_BUILD_DIR'])
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    # url_for('static', filename='css/style.css') -> /static/css/style.<digest>.css
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = static_assets.url_path(values['filename'])
+
+def send_static_asset(filename):
+    original = static_assets.original(filename)
+    if original is None:
+        # Unfingerprinted URL: revalidate unless the name itself is a content hash
+        response = send_from_directory(app.static_folder, filename)
+        if is_content_hashed(os.path.basename(filename)):
+            cache_forever(response)
+        return response
+
+    if not original.endswith(PRECOMPRESS_EXTENSIONS):
+        return cache_forever(send_from_directory(app.static_folder, original))
+
+    encoding = static_assets.best_encoding(filename, request.accept_encodings)
+    if encoding:
+        mimetype = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+        response = send_from_directory(static_assets.build_dir, filename + ENCODING_SUFFIXES[encoding],
+                                       mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(app.static_folder, original)
+    response.vary.add('Accept-Encoding')
+    return cache_forever(response)
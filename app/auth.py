@@ -1,9 +1,31 @@
 from functools import wraps
 from flask import request, jsonify
 import jwt
-from app import app, mongo
+import logging
+from app import app, mongo, identity_cache
 from bson import ObjectId
 
+logger = logging.getLogger(__name__)
+
+def load_identity(email):
+    user = mongo.db.users.find_one({'email': email})
+    logger.debug("Loaded identity for %s (found=%s)", email, user is not None)
+    if user:
+        # Convert ObjectId to string
+        user['_id'] = str(user['_id'])
+    return user
+
+def invalidate_user_identity(email=None, user_id=None):
+    """Drop cached identities for a user.
+
+    Call this after deleting a user or changing their role so the change applies
+    to this worker immediately; other workers pick it up within IDENTITY_CACHE_TTL.
+    """
+    if email:
+        identity_cache.invalidate_prefix('token', email)
+    if user_id:
+        identity_cache.invalidate(('user', str(user_id)))
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -23,34 +45,32 @@ def token_required(f):
         try:
             # Decode the token
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            print("Token data:", data)  # Debug print
             
             # Get user from database
             user_data = data.get('sub', {})
-            print("User data from token:", user_data)  # Debug print
             
             if not user_data or 'email' not in user_data:
                 return jsonify({'error': 'Invalid token data'}), 401
             
-            # Find user in database
-            user = mongo.db.users.find_one({'email': user_data['email']})
-            print("User from database:", user)  # Debug print
+            # Find user in the identity cache, falling back to the database
+            cache_key = ('token', user_data['email'], data.get('jti') or token)
+            user = identity_cache.get_or_load(cache_key, lambda: load_identity(user_data['email']))
             
             if not user:
+                # Don't cache misses, so a user created later is found right away
+                identity_cache.invalidate(cache_key)
                 return jsonify({'error': 'User not found'}), 401
             
-            # Convert ObjectId to string
-            user['_id'] = str(user['_id'])
-            
-            return f(user, *args, **kwargs)
+            # Hand the route its own copy so it can't modify the cached document
+            return f(dict(user), *args, **kwargs)
             
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
         except jwt.InvalidTokenError as e:
-            print("Token validation error:", str(e))  # Debug print
+            logger.info("Token validation error: %s", e)
             return jsonify({'error': 'Invalid token'}), 401
         except Exception as e:
-            print("Unexpected error in token validation:", str(e))  # Debug print
+            logger.exception("Unexpected error in token validation")
             return jsonify({'error': 'Token validation failed'}), 401
     
     return decorated 
\ No newline at end of file
@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from flask import copy_current_request_context, has_request_context
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Bounded in-process LRU cache with a TTL and stale-while-revalidate.
+
+    Entries younger than `ttl` seconds are served as-is. Entries older than that
+    but younger than `ttl + stale_ttl` are still served, while a background thread
+    reloads them, so a slow or unavailable database doesn't block readers. Older
+    entries are reloaded on the request thread. Background reloads run with a copy
+    of the current request context, so loaders can use url_for and templates.
+    """
+
+    def __init__(self, max_size=1024, ttl=60, stale_ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        # Bumped on every invalidation so loads that started earlier don't store stale data
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` to fill it when needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        # Only the background path gets the copied context: popping a copy
+                        # runs the teardown_request hooks, which must not happen mid-request
+                        if has_request_context():
+                            loader = copy_current_request_context(loader)
+                        threading.Thread(target=self._refresh, args=(key, loader, self._generation),
+                                         daemon=True).start()
+                    return value
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        self.set(key, value, generation)
+        return value
+
+    def _refresh(self, key, loader, generation):
+        try:
+            self.set(key, loader(), generation)
+        except Exception as e:
+            # Keep serving the stale entry until it ages out
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning("Error refreshing cache entry %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def invalidate_prefix(self, *prefix):
+        """Drop every entry whose tuple key starts with `prefix`."""
+        with self._lock:
+            for key in [k for k in self._entries if isinstance(k, tuple) and k[:len(prefix)] == prefix]:
+                del self._entries[key]
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'refresh_errors': self.refresh_errors,
+                'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+            }
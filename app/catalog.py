@@ -0,0 +1,92 @@
+from flask import request, make_response
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from app import app, mongo
+from app.cache import TTLCache
+import datetime
+import hashlib
+import os
+
+# Version stamps are re-read often so every worker notices another worker's writes
+# within CATALOG_VERSION_TTL seconds, but still served stale while Mongo is down.
+app.config['CATALOG_VERSION_TTL'] = float(os.getenv('CATALOG_VERSION_TTL', 1))
+version_cache = TTLCache(max_size=app.config['CATALOG_CACHE_SIZE'],
+                         ttl=app.config['CATALOG_VERSION_TTL'],
+                         stale_ttl=app.config['CATALOG_CACHE_STALE_TTL'])
+
+CATALOG_VERSION_ID = 'products'
+
+READ_PREFERENCES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest
+}
+_catalog_db = (None, None)
+
+def catalog_db():
+    """mongo.db with MONGO_CATALOG_READ_PREFERENCE, for product reads that tolerate lag.
+
+    Used by search and the featured ranking. Anything cached or ETagged under a
+    version from get_catalog_version() or get_product_version() reads the primary
+    like the version itself, since a lagging secondary could return data older than
+    that version and it would then be served as current until the next write.
+    """
+    global _catalog_db
+    db, catalog = _catalog_db
+    if db is not mongo.db:
+        mode = READ_PREFERENCES[app.config['MONGO_CATALOG_READ_PREFERENCE']]
+        staleness = app.config['MONGO_CATALOG_MAX_STALENESS']
+        read_preference = mode() if mode is Primary else mode(max_staleness=staleness)
+        db, catalog = mongo.db, mongo.db.with_options(read_preference=read_preference)
+        _catalog_db = (db, catalog)
+    return catalog
+
+def get_catalog_version():
+    """Return the collection-level version stamp, bumped on every product write."""
+    def load_version():
+        doc = mongo.db.catalog_meta.find_one({'_id': CATALOG_VERSION_ID}, {'version': 1})
+        return doc['version'] if doc else 0
+    return version_cache.get_or_load(('catalog',), load_version)
+
+def get_product_version(product_id):
+    """Return the product's version, or None if it doesn't exist.
+
+    Products written before versioning was introduced report version 0.
+    """
+    def load_version():
+        doc = mongo.db.products.find_one({'_id': product_id}, {'version': 1})
+        return doc.get('version', 0) if doc else None
+    return version_cache.get_or_load(('product', str(product_id)), load_version)
+
+def bump_catalog_version(*product_ids):
+    """Record a product write so listings (and the given products) get new ETags."""
+    mongo.db.catalog_meta.update_one(
+        {'_id': CATALOG_VERSION_ID},
+        {'$inc': {'version': 1}, '$set': {'updated_at': datetime.datetime.utcnow()}},
+        upsert=True
+    )
+    version_cache.invalidate(('catalog',))
+    for product_id in product_ids:
+        version_cache.invalidate(('product', str(product_id)))
+
+def make_etag(*parts):
+    """Build a strong ETag value from the given parts."""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def request_matches_etag(etag):
+    # If-None-Match uses weak comparison; compressed responses carry the weak form
+    return request.if_none_match.contains_weak(etag)
+
+def _set_validators(response, etag):
+    response.set_etag(etag)
+    # Clients may store the body but must revalidate before reusing it
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    return response
+
+def not_modified_response(etag):
+    return _set_validators(make_response('', 304), etag)
+
+def with_etag(response, etag):
+    return _set_validators(make_response(response), etag)
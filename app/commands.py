@@ -0,0 +1,165 @@
+import click
+from pymongo import UpdateOne
+from app import app, mongo
+from app.indexes import ensure_indexes, index_usage, collection_scan_counts
+from app.vendor_stats import rebuild_vendor_stats
+from app.images import Image, generate_variants, images_dir
+from app.assets import static_assets, brotli
+from app.featured import featured_ranking
+from app.importer import IMPORT_FORMATS, DEFAULT_BATCH_SIZE, detect_format, iter_rows, import_products
+import datetime
+import json
+import os
+import time
+from werkzeug.security import generate_password_hash
+
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create any missing indexes from the registry."""
+    failures = ensure_indexes(mongo.db)
+    if failures:
+        for collection_name, names in failures.items():
+            click.echo(f"{collection_name}: failed to build {', '.join(names)}", err=True)
+        raise SystemExit(1)
+    click.echo('All indexes are in place')
+
+@app.cli.command('index-stats')
+def index_stats_command():
+    """Print how often each index has been used since the server started."""
+    for collection_name, indexes in index_usage(mongo.db).items():
+        click.echo(collection_name)
+        for index in indexes:
+            marker = '  (unused)' if index['ops'] == 0 else ''
+            click.echo(f"  {index['name']:<28} {index['ops']:>12} ops since {index['since']:%Y-%m-%d %H:%M}{marker}")
+
+    scans = collection_scan_counts(mongo.db)
+    if scans is not None:
+        click.echo(f"Collection scans: {scans.get('total', 0)} total, "
+                   f"{scans.get('nonTailable', 0)} non-tailable")
+
+def _backfill_vendor_batch(orders):
+    product_ids = {item['product_id'] for order in orders for item in order.get('items', [])}
+    vendors = {p['_id']: p.get('vendor_email') for p in mongo.db.products.find(
+        {'_id': {'$in': list(product_ids)}}, {'vendor_email': 1})}
+    updates = []
+    for order in orders:
+        items = order.get('items', [])
+        for item in items:
+            item.setdefault('vendor_email', vendors.get(item['product_id']))
+        vendor_emails = sorted({item['vendor_email'] for item in items if item.get('vendor_email')})
+        updates.append(UpdateOne({'_id': order['_id']},
+                                 {'$set': {'items': items, 'vendor_emails': vendor_emails}}))
+    mongo.db.orders.bulk_write(updates, ordered=False)
+
+@app.cli.command('backfill-order-vendors')
+@click.option('--batch-size', default=500, show_default=True, help='Orders updated per bulk write.')
+def backfill_order_vendors_command(batch_size):
+    """Add vendor_emails to orders created before it was recorded at checkout."""
+    cursor = mongo.db.orders.find({'vendor_emails': {'$exists': False}}, {'items': 1}).batch_size(batch_size)
+    batch, updated = [], 0
+    for order in cursor:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            _backfill_vendor_batch(batch)
+            updated += len(batch)
+            batch = []
+    if batch:
+        _backfill_vendor_batch(batch)
+        updated += len(batch)
+    click.echo(f'Backfilled vendor_emails on {updated} orders')
+
+@app.cli.command('rebuild-vendor-stats')
+def rebuild_vendor_stats_command():
+    """Recompute vendor_stats from orders.
+
+    Run it when checkout traffic is quiet: orders placed while it runs may be
+    missing from the rebuilt counters.
+    """
+    count = rebuild_vendor_stats()
+    click.echo(f'Rebuilt vendor_stats with {count} documents')
+
+@app.cli.command('build-image-variants')
+def build_image_variants_command():
+    """Generate resized WebP/JPEG variants for every image in static/images."""
+    if Image is None:
+        raise click.ClickException('Pillow is not installed')
+    built = 0
+    for filename in sorted(os.listdir(images_dir())):
+        if not os.path.isfile(os.path.join(images_dir(), filename)):
+            continue
+        try:
+            generate_variants(filename)
+            built += 1
+        except Exception as e:
+            click.echo(f"{filename}: {str(e)}", err=True)
+    click.echo(f'Built variants for {built} images')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint static files and write gzip/brotli copies of CSS and JS."""
+    count = static_assets.build()
+    encodings = 'gzip and brotli' if brotli is not None else 'gzip (install brotli for .br files)'
+    click.echo(f'Fingerprinted {count} static files; precompressed CSS/JS with {encodings}')
+
+@app.cli.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--vendor', required=True, help='Email of the vendor who owns the imported products.')
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Rows per bulk write.')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), help='Also write row errors here as JSONL.')
+def import_products_command(path, vendor, fmt, batch_size, errors_path):
+    """Stream products from a CSV or JSONL file, upserting by the vendor's SKU."""
+    if not mongo.db.users.find_one({'email': vendor, 'role': 'vendor'}, {'_id': 1}):
+        raise click.ClickException(f'No vendor with email {vendor}')
+    try:
+        fmt = fmt or detect_format(path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    errors_file = open(errors_path, 'w') if errors_path else None
+    started = time.monotonic()
+
+    def on_error(row_number, sku, message):
+        click.echo(f'row {row_number} (sku {sku}): {message}', err=True)
+        if errors_file:
+            errors_file.write(json.dumps({'row': row_number, 'sku': sku, 'error': message}) + '\n')
+
+    def on_progress(stats):
+        elapsed = time.monotonic() - started
+        click.echo(f"{stats['rows']} rows, {stats['inserted']} inserted, {stats['updated']} updated, "
+                   f"{stats['errors']} errors ({stats['rows'] / elapsed if elapsed else 0:.0f} rows/s)", err=True)
+
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            stats = import_products(iter_rows(f, fmt), vendor, batch_size=batch_size,
+                                    on_error=on_error, on_progress=on_progress)
+    finally:
+        if errors_file:
+            errors_file.close()
+    elapsed = time.monotonic() - started
+    click.echo(f"Imported {stats['rows']} rows in {elapsed:.1f}s: {stats['inserted']} inserted, "
+               f"{stats['updated']} updated, {stats['errors']} errors")
+    if stats['errors']:
+        raise SystemExit(1)
+
+@app.cli.command('refresh-featured')
+@click.option('--top', default=10, show_default=True, help='number of ranked products to print')
+def refresh_featured_command(top):
+    """Compute the featured ranking now and print the top products with their scores."""
+    ranking = featured_ranking.refresh()
+    click.echo(f'Ranked {len(ranking)} products')
+    for position, (product_id, score) in enumerate(ranking[:top], 1):
+        click.echo(f'  {position:>3}. {product_id}  {score:.4f}')
+
+@app.cli.command('create-admin')
+@click.argument('email')
+@click.password_option()
+def create_admin_command(email, password):
+    """Create an admin user, or make an existing user an admin with this password."""
+    result = mongo.db.users.update_one(
+        {'email': email},
+        {'$set': {'role': 'admin', 'password': generate_password_hash(password)},
+         '$setOnInsert': {'email': email, 'created_at': datetime.datetime.utcnow()}},
+        upsert=True
+    )
+    click.echo(f"{'Created' if result.upserted_id else 'Promoted'} admin {email}")
@@ -0,0 +1,93 @@
+import os
+import zlib
+from flask import request
+from app import app
+
+# Brotli is optional: without it responses are only gzip-compressed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+
+# Images, archives and fonts are already compressed; only text-like bodies are worth it
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'application/xml',
+                          'application/x-ndjson', 'image/svg+xml')
+
+def _is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+def _choose_encoding(accept_encodings):
+    """Pick br or gzip from Accept-Encoding, honouring the client's q-values."""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = None
+    best_quality = 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def _compressor(encoding):
+    if encoding == 'br':
+        return brotli.Compressor(quality=app.config['COMPRESS_BROTLI_QUALITY'])
+    # wbits=31 writes a gzip header and trailer
+    return zlib.compressobj(app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+    compressor = _compressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+def _compress_stream(chunks, encoding):
+    """Compress a streamed body chunk by chunk, flushing so clients see each chunk promptly."""
+    compressor = _compressor(encoding)
+    if encoding == 'br':
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+@app.after_request
+def compress_response(response):
+    if not app.config['COMPRESS_ENABLED']:
+        return response
+    if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or not _is_compressible(response.mimetype)):
+        return response
+    # send_file responses (static assets) pass through; those are precompressed at build time
+    if response.direct_passthrough or response.cache_control.no_transform:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    # The compressed body is a different byte sequence, so a strong ETag becomes weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
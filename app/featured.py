@@ -0,0 +1,163 @@
+import datetime
+import logging
+import math
+import os
+import threading
+from bson import ObjectId
+from app import app
+from app.catalog import catalog_db
+from app.vendor_stats import CANCELLED
+
+logger = logging.getLogger(__name__)
+
+app.config['FEATURED_REFRESH_INTERVAL'] = float(os.getenv('FEATURED_REFRESH_INTERVAL', 300))
+app.config['FEATURED_SIZE'] = int(os.getenv('FEATURED_SIZE', 60))
+app.config['FEATURED_SALES_WINDOW_DAYS'] = float(os.getenv('FEATURED_SALES_WINDOW_DAYS', 7))
+app.config['FEATURED_RECENCY_HALF_LIFE_DAYS'] = float(os.getenv('FEATURED_RECENCY_HALF_LIFE_DAYS', 14))
+# Stock at or above which a product gets the full availability score
+app.config['FEATURED_STOCK_TARGET'] = int(os.getenv('FEATURED_STOCK_TARGET', 20))
+# Newest in-stock products considered alongside everything that sold in the window
+app.config['FEATURED_NEW_CANDIDATES'] = int(os.getenv('FEATURED_NEW_CANDIDATES', 500))
+app.config['FEATURED_WEIGHT_SALES'] = float(os.getenv('FEATURED_WEIGHT_SALES', 0.6))
+app.config['FEATURED_WEIGHT_STOCK'] = float(os.getenv('FEATURED_WEIGHT_STOCK', 0.15))
+app.config['FEATURED_WEIGHT_RECENCY'] = float(os.getenv('FEATURED_WEIGHT_RECENCY', 0.25))
+
+RANKING_PROJECTION = {'stock': 1, 'created_at': 1}
+
+def units_sold_since(since):
+    """Return {product_id: units} over non-cancelled orders placed since `since`."""
+    pipeline = [
+        {'$match': {'created_at': {'$gte': since}, 'status': {'$ne': CANCELLED}}},
+        {'$unwind': '$items'},
+        {'$group': {'_id': '$items.product_id', 'units': {'$sum': '$items.quantity'}}}
+    ]
+    return {doc['_id']: doc['units'] for doc in catalog_db().orders.aggregate(pipeline)}
+
+def _candidates(sold_ids):
+    """In-stock products that sold in the window, plus the newest in-stock products.
+
+    A product that neither sold recently nor is among the newest can score at most
+    the stock weight plus a decayed recency, so it is left out rather than scanning
+    the whole catalog.
+    """
+    products = {}
+    if sold_ids:
+        for product in catalog_db().products.find({'_id': {'$in': sold_ids}, 'stock': {'$gt': 0}},
+                                              RANKING_PROJECTION):
+            products[product['_id']] = product
+    newest = catalog_db().products.find({'stock': {'$gt': 0}}, RANKING_PROJECTION).sort('_id', -1).limit(
+        app.config['FEATURED_NEW_CANDIDATES'])
+    for product in newest:
+        products[product['_id']] = product
+    return products.values()
+
+def compute_ranking(now=None):
+    """Score candidate products and return the top FEATURED_SIZE as [(product_id, score)].
+
+    The score is a weighted sum of three parts, each between 0 and 1:
+    sales velocity (units sold in the window, log-scaled against the best seller),
+    availability (stock up to FEATURED_STOCK_TARGET) and recency (halving every
+    FEATURED_RECENCY_HALF_LIFE_DAYS since the product was created).
+    """
+    config = app.config
+    now = now or datetime.datetime.utcnow()
+    since = now - datetime.timedelta(days=config['FEATURED_SALES_WINDOW_DAYS'])
+    units = {}
+    for product_id, sold in units_sold_since(since).items():
+        if isinstance(product_id, str) and ObjectId.is_valid(product_id):
+            product_id = ObjectId(product_id)
+        units[product_id] = units.get(product_id, 0) + sold
+    # log1p keeps one runaway best seller from flattening everyone else's sales score
+    max_sales = math.log1p(max(units.values(), default=0))
+    stock_target = max(config['FEATURED_STOCK_TARGET'], 1)
+    half_life = config['FEATURED_RECENCY_HALF_LIFE_DAYS']
+
+    ranking = []
+    for product in _candidates(list(units)):
+        sales = math.log1p(units.get(product['_id'], 0)) / max_sales if max_sales else 0.0
+        stock = min(product.get('stock', 0), stock_target) / stock_target
+        created_at = product.get('created_at') or product['_id'].generation_time.replace(tzinfo=None)
+        age_days = max((now - created_at).total_seconds() / 86400, 0)
+        recency = 0.5 ** (age_days / half_life) if half_life > 0 else 0.0
+        score = (config['FEATURED_WEIGHT_SALES'] * sales + config['FEATURED_WEIGHT_STOCK'] * stock
+                 + config['FEATURED_WEIGHT_RECENCY'] * recency)
+        ranking.append((product['_id'], score))
+    # Ties go to the newer product, so the order is stable between refreshes
+    ranking.sort(key=lambda entry: (entry[1], entry[0]), reverse=True)
+    return ranking[:config['FEATURED_SIZE']]
+
+class FeaturedRanking:
+    """In-memory snapshot of the featured ranking, refreshed by a scheduler thread.
+
+    The first request starts the scheduler thread, which computes the snapshot
+    straight away and then every FEATURED_REFRESH_INTERVAL seconds, so requests
+    only read the ranked ids and never aggregate orders themselves (or wait on
+    them under their query budget); `ready` is False until the first snapshot. `generation` changes
+    whenever a refresh changes the ranking and goes into cache keys and ETags.
+    """
+
+    def __init__(self, refresh_interval=300):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._ids = None
+        self._positions = {}
+        self.generation = 0
+        self.refreshed_at = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def refresh(self):
+        ranking = compute_ranking()
+        ids = [product_id for product_id, _ in ranking]
+        with self._lock:
+            # An unchanged ranking keeps its generation, so cached pages and ETags stay valid
+            if ids != self._ids:
+                self._ids = ids
+                self._positions = {product_id: i for i, product_id in enumerate(ids)}
+                self.generation += 1
+            self.refreshed_at = datetime.datetime.utcnow()
+        logger.debug("Refreshed featured ranking with %d products", len(ids))
+        return ranking
+
+    @property
+    def ready(self):
+        return self._ids is not None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.exception("Error refreshing featured ranking")
+            # Until a first snapshot exists, retry sooner than the refresh interval
+            if self._stop.wait(self.refresh_interval if self.ready else min(self.refresh_interval, 5)):
+                break
+
+    def ensure_started(self):
+        """Start the scheduler thread if it isn't running; it computes the first snapshot."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='featured-ranking', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def page(self, after=None, limit=6):
+        """Return (generation, product_ids, next_cursor) for one page of the ranking.
+
+        `after` is the ObjectId of the last product on the previous page. A product
+        that dropped out of the ranking in a refresh since then ends the listing
+        (an empty page without a cursor) rather than failing or starting over.
+        """
+        with self._lock:
+            ids, positions, generation = self._ids or [], self._positions, self.generation
+        start = 0
+        if after is not None:
+            start = positions[after] + 1 if after in positions else len(ids)
+        page_ids = ids[start:start + limit]
+        next_cursor = str(page_ids[-1]) if page_ids and start + limit < len(ids) else None
+        return generation, page_ids, next_cursor
+
+featured_ranking = FeaturedRanking(refresh_interval=app.config['FEATURED_REFRESH_INTERVAL'])
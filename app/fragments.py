@@ -0,0 +1,24 @@
+from flask import render_template
+from markupsafe import Markup
+from app import catalog_cache
+from app.catalog import get_catalog_version
+
+FRAGMENT_NAMESPACE = 'fragment'
+
+def render_fragment(template_name, key_parts, load_context):
+    """Render a catalog fragment, caching the HTML per catalog version.
+
+    `key_parts` are the normalized query args the fragment depends on, and
+    `load_context()` returns the template context; it is only called on a miss.
+    Fragments are shared between all visitors, so they must not use current_user.
+    Product write routes drop them through invalidate_catalog_cache, and the version
+    in the key keeps other workers from serving them after a write.
+    """
+    key = (FRAGMENT_NAMESPACE, template_name, get_catalog_version()) + tuple(key_parts)
+
+    # Stale entries are re-rendered on a background thread; TTLCache gives it a copy
+    # of the request context for url_for
+    def render():
+        return render_template(template_name, **load_context())
+
+    return Markup(catalog_cache.get_or_load(key, render))
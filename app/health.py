@@ -0,0 +1,117 @@
+import datetime
+import logging
+import os
+import threading
+import time
+import pymongo
+from pymongo.errors import PyMongoError
+from app import app, mongo
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+app.config['HEALTH_PING_INTERVAL'] = float(os.getenv('HEALTH_PING_INTERVAL', 5))
+app.config['HEALTH_PING_TIMEOUT_MS'] = int(os.getenv('HEALTH_PING_TIMEOUT_MS', 2000))
+# /readyz fails once the last successful ping is older than this many seconds
+app.config['HEALTH_MAX_PING_AGE'] = float(os.getenv('HEALTH_MAX_PING_AGE', 30))
+app.config['DB_STATS_CACHE_TTL'] = float(os.getenv('DB_STATS_CACHE_TTL', 60))
+
+class MongoPinger:
+    """Pings Mongo on a background thread and keeps the last result for /readyz.
+
+    Probes read the stored result, so however often a load balancer polls, the
+    server only sees one ping per HEALTH_PING_INTERVAL seconds per worker.
+    """
+
+    def __init__(self, interval=5, timeout_ms=2000, max_age=30):
+        self.interval = interval
+        self.timeout_ms = timeout_ms
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_ok = None          # monotonic time of the last successful ping
+        self.ok = None
+        self.latency_ms = None
+        self.checked_at = None
+        self.error = None
+        self.consecutive_failures = 0
+
+    def ping(self):
+        started = time.perf_counter()
+        try:
+            with pymongo.timeout(self.timeout_ms / 1000):
+                mongo.db.command('ping')
+            ok, error = True, None
+        except PyMongoError as e:
+            ok, error = False, str(e)
+        latency_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            if ok:
+                self._last_ok = time.monotonic()
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+            self.ok, self.error = ok, error
+            self.latency_ms = round(latency_ms, 3)
+            self.checked_at = datetime.datetime.utcnow()
+        if not ok:
+            logger.warning("Mongo ping failed (%d in a row): %s", self.consecutive_failures, error)
+        return ok
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.ping()
+            except Exception as e:
+                logger.exception("Error in Mongo pinger")
+
+    def ensure_started(self):
+        """Ping once if nothing has been recorded yet and start the pinger thread."""
+        if self.checked_at is None:
+            self.ping()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='mongo-pinger', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """Return (ready, details) from the last recorded ping."""
+        with self._lock:
+            age = time.monotonic() - self._last_ok if self._last_ok is not None else None
+            ready = bool(self.ok) and age is not None and age <= self.max_age
+            return ready, {
+                'ok': self.ok,
+                'latency_ms': self.latency_ms,
+                'checked_at': self.checked_at,
+                'last_success_age_s': round(age, 3) if age is not None else None,
+                'consecutive_failures': self.consecutive_failures,
+                'error': self.error
+            }
+
+mongo_pinger = MongoPinger(interval=app.config['HEALTH_PING_INTERVAL'],
+                           timeout_ms=app.config['HEALTH_PING_TIMEOUT_MS'],
+                           max_age=app.config['HEALTH_MAX_PING_AGE'])
+
+# dbStats walks every collection's storage stats, so admins share one cached result
+db_stats_cache = TTLCache(max_size=1, ttl=app.config['DB_STATS_CACHE_TTL'], stale_ttl=0)
+
+def load_db_stats():
+    stats = mongo.db.command('dbStats')
+    return {
+        'name': stats['db'],
+        'collections': sorted(mongo.db.list_collection_names()),
+        'objects': stats.get('objects'),
+        'data_size': stats.get('dataSize'),
+        'storage_size': stats.get('storageSize'),
+        'indexes': stats.get('indexes'),
+        'index_size': stats.get('indexSize'),
+        'computed_at': datetime.datetime.utcnow()
+    }
+
+def get_db_stats():
+    return db_stats_cache.get_or_load(('db_stats',), load_db_stats)
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import re
+import threading
+from app import app
+
+logger = logging.getLogger(__name__)
+
+# Pillow is optional: without it uploads are still saved, just without variants
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Longest edge, in pixels, of each generated variant
+IMAGE_SIZES = {
+    'thumb': 160,
+    'card': 400,
+    'detail': 1024
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+VARIANTS_DIR = 'variants'
+DEFAULT_IMAGE = 'default-product.png'
+# Uploads (and their variants) are named after a hash of their content, so they never change
+CONTENT_HASHED_NAME = re.compile(r'^[0-9a-f]{32}(-[a-z]+)?\.[a-z0-9]+$')
+
+app.config['IMAGE_WORKERS'] = int(os.getenv('IMAGE_WORKERS', 2))
+app.config['IMAGE_QUEUE_SIZE'] = int(os.getenv('IMAGE_QUEUE_SIZE', 64))
+
+_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='image-variants')
+# Caps queued + running jobs so a burst of uploads can't grow memory without bound
+_slots = threading.BoundedSemaphore(app.config['IMAGE_QUEUE_SIZE'])
+
+def images_dir():
+    return os.path.join(app.static_folder, 'images')
+
+def variants_dir():
+    return os.path.join(images_dir(), VARIANTS_DIR)
+
+def variant_filename(filename, size, fmt):
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}-{size}.{fmt}"
+
+def variant_path(filename, size, fmt):
+    return os.path.join(variants_dir(), variant_filename(filename, size, fmt))
+
+def is_content_hashed(filename):
+    return CONTENT_HASHED_NAME.match(filename) is not None
+
+def save_upload(file_storage, extension):
+    """Save an upload under a content-hashed name.
+
+    Returns (filename, is_new). Uploading the same bytes again returns the existing
+    file without writing anything.
+    """
+    data = file_storage.read()
+    filename = f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+    path = os.path.join(images_dir(), filename)
+    if os.path.exists(path):
+        return filename, False
+
+    os.makedirs(images_dir(), exist_ok=True)
+    # Write to a temp name first so readers never see a partial file
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return filename, True
+
+def generate_variants(filename):
+    """Write every size/format variant of an image in static/images."""
+    if Image is None:
+        return
+    os.makedirs(variants_dir(), exist_ok=True)
+    with Image.open(os.path.join(images_dir(), filename)) as original:
+        original.load()
+        has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+        for size, edge in IMAGE_SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((edge, edge))
+            for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+                path = variant_path(filename, size, fmt)
+                if os.path.exists(path):
+                    continue
+                image = resized
+                if pil_format == 'JPEG':
+                    # JPEG has no alpha channel; flatten onto white
+                    background = Image.new('RGB', resized.size, (255, 255, 255))
+                    if has_alpha:
+                        background.paste(resized.convert('RGBA'), mask=resized.convert('RGBA').split()[-1])
+                    else:
+                        background.paste(resized.convert('RGB'))
+                    image = background
+                elif image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if has_alpha else 'RGB')
+                tmp_path = f"{path}.tmp"
+                image.save(tmp_path, pil_format, **options)
+                os.replace(tmp_path, path)
+
+def _run_job(filename):
+    try:
+        generate_variants(filename)
+    except Exception as e:
+        logger.exception("Error generating variants for %s", filename)
+    finally:
+        _slots.release()
+
+def schedule_variants(filename):
+    """Queue variant generation without blocking; returns False if the queue is full."""
+    if Image is None:
+        return False
+    if not _slots.acquire(blocking=False):
+        logger.warning("Image variant queue is full, skipping %s", filename)
+        return False
+    _executor.submit(_run_job, filename)
+    return True
+
+def find_variant(filename, size, accept_webp):
+    """Return the variant filename to serve, preferring WebP when the client accepts it."""
+    for fmt in (('webp', 'jpg') if accept_webp else ('jpg',)):
+        name = variant_filename(filename, size, fmt)
+        if os.path.isfile(os.path.join(variants_dir(), name)):
+            return name
+    return None
@@ -0,0 +1,129 @@
+import csv
+import datetime
+import json
+import os
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app import mongo
+from app.catalog import bump_catalog_version
+from app.products import validate_product
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 1000
+# CSV files list several images in one cell: "a.png|b.png"
+IMAGE_SEPARATOR = '|'
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f"Can't tell the format of {path}; pass one of: {', '.join(IMPORT_FORMATS)}")
+
+def iter_rows(f, fmt):
+    """Stream (row_number, data, error) tuples from an open CSV or JSONL file.
+
+    row_number is the file line the row ended on, so errors can be found in the
+    source file. Rows that can't be parsed have data None and an error message.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Blank cells count as missing, like absent keys in a JSON row
+            data = {key.strip(): value.strip() for key, value in row.items()
+                    if key and isinstance(value, str) and value.strip()}
+            if 'images' in data:
+                data['images'] = [image.strip() for image in data['images'].split(IMAGE_SEPARATOR) if image.strip()]
+            yield reader.line_num, data, None
+        return
+
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, data, None
+
+def _upsert(product, vendor_email, now):
+    fields = {key: value for key, value in product.items() if key != 'sku'}
+    fields['updated_at'] = now
+    return UpdateOne(
+        {'vendor_email': vendor_email, 'sku': product['sku']},
+        {'$set': fields, '$inc': {'version': 1},
+         '$setOnInsert': {'vendor_email': vendor_email, 'sku': product['sku'], 'created_at': now}},
+        upsert=True
+    )
+
+def import_products(rows, vendor_email, batch_size=DEFAULT_BATCH_SIZE, on_error=None, on_progress=None):
+    """Upsert products for one vendor, keyed by SKU, in unordered bulk batches.
+
+    `rows` yields (row_number, data, error) as produced by iter_rows. Rows are
+    validated with the same rules as POST /api/products; a bad row is passed to
+    on_error(row_number, sku, message) and skipped without stopping the import.
+    on_progress(stats) is called after every batch. Only one batch is held in
+    memory at a time, so files of any size import in fixed memory.
+    """
+    stats = {'rows': 0, 'inserted': 0, 'updated': 0, 'errors': 0}
+    batch = []   # (row_number, sku, operation)
+    batch_skus = set()
+
+    def report(row_number, sku, message):
+        stats['errors'] += 1
+        if on_error:
+            on_error(row_number, sku, message)
+
+    def flush():
+        if not batch:
+            return
+        try:
+            result = mongo.db.products.bulk_write([operation for _, _, operation in batch], ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details['writeErrors']:
+                row_number, sku, _ = batch[error['index']]
+                report(row_number, sku, error.get('errmsg', 'Write failed'))
+        stats['inserted'] += details.get('nUpserted', 0)
+        stats['updated'] += details.get('nModified', 0)
+        batch.clear()
+        batch_skus.clear()
+        if on_progress:
+            on_progress(stats)
+
+    for row_number, data, error in rows:
+        stats['rows'] += 1
+        sku = data.get('sku') if data else None
+        if error is None:
+            try:
+                product = validate_product(data)
+                if 'sku' not in product:
+                    raise ValueError('Missing required field: sku')
+            except ValueError as e:
+                error = str(e)
+            except Exception as e:
+                # A malformed row is reported like any other invalid row, never aborting the import
+                error = f'Invalid row: {e}'
+        if error:
+            report(row_number, sku, error)
+            continue
+
+        # Two upserts of one SKU in the same unordered batch could race; flush between them
+        if product['sku'] in batch_skus:
+            flush()
+        batch.append((row_number, product['sku'], _upsert(product, vendor_email, datetime.datetime.utcnow())))
+        batch_skus.add(product['sku'])
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    # Catalog listings, ETags and autocomplete pick up the new version in every worker
+    if stats['inserted'] or stats['updated']:
+        bump_catalog_version()
+    return stats
@@ -0,0 +1,86 @@
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every index the routes rely on, grouped by collection. Index names are fixed so
+# that re-running ensure_indexes() is a no-op against an up-to-date database.
+INDEXES = {
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'carts': [
+        IndexModel([('user_email', ASCENDING)], name='user_email_unique', unique=True),
+    ],
+    'products': [
+        # Listing filters, each paired with the keyset sort on _id
+        IndexModel([('category', ASCENDING), ('_id', ASCENDING)], name='category_id'),
+        IndexModel([('vendor_email', ASCENDING), ('_id', ASCENDING)], name='vendor_email_id'),
+        # Secondary sort orders offered by app.pagination
+        IndexModel([('price', ASCENDING), ('_id', ASCENDING)], name='price_id'),
+        IndexModel([('name', ASCENDING), ('_id', ASCENDING)], name='name_id'),
+        # Ranked keyword search (/api/products/search)
+        IndexModel([('name', TEXT), ('category', TEXT), ('description', TEXT)], name='text_search',
+                   weights={'name': 10, 'category': 5, 'description': 1}),
+        # Bulk imports upsert by (vendor, SKU); products without a SKU are not indexed
+        IndexModel([('vendor_email', ASCENDING), ('sku', ASCENDING)], name='vendor_sku_unique', unique=True,
+                   partialFilterExpression={'sku': {'$type': 'string'}}),
+    ],
+    'orders': [
+        # Customer and vendor order history, paged newest first by _id
+        IndexModel([('user_email', ASCENDING), ('_id', DESCENDING)], name='user_email_id'),
+        IndexModel([('vendor_emails', ASCENDING), ('_id', DESCENDING)], name='vendor_emails_id'),
+        IndexModel([('items.product_id', ASCENDING)], name='items_product_id'),
+        # Recent sales window for the featured ranking
+        IndexModel([('created_at', DESCENDING)], name='created_at'),
+    ],
+    'vendor_stats': [
+        # Daily series and top products on the vendor dashboard
+        IndexModel([('vendor_email', ASCENDING), ('kind', ASCENDING), ('date', ASCENDING)], name='vendor_kind_date'),
+        IndexModel([('vendor_email', ASCENDING), ('kind', ASCENDING), ('revenue', DESCENDING)], name='vendor_kind_revenue'),
+    ],
+    'coupons': [
+        IndexModel([('code', ASCENDING)], name='code_unique', unique=True),
+    ],
+}
+
+def ensure_indexes(db):
+    """Create every registered index, skipping ones that already exist.
+
+    Returns a dict of collection name -> list of index names that failed to build,
+    so one bad index (e.g. duplicates blocking a unique index) doesn't stop the rest.
+    """
+    failures = {}
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for index in indexes:
+            try:
+                collection.create_indexes([index])
+            except ConnectionFailure:
+                # No point trying the remaining indexes against an unreachable server
+                raise
+            except PyMongoError as e:
+                name = index.document['name']
+                logger.error("Error creating index %s.%s: %s", collection_name, name, e)
+                failures.setdefault(collection_name, []).append(name)
+    return failures
+
+def index_usage(db):
+    """Return per-collection $indexStats results for the registered collections."""
+    usage = {}
+    for collection_name in INDEXES:
+        stats = db[collection_name].aggregate([{'$indexStats': {}}])
+        usage[collection_name] = sorted(
+            ({'name': s['name'], 'ops': s['accesses']['ops'], 'since': s['accesses']['since']} for s in stats),
+            key=lambda s: s['name']
+        )
+    return usage
+
+def collection_scan_counts(db):
+    """Return the server's collection scan counters, or None if unavailable."""
+    try:
+        status = db.command('serverStatus')
+        return status['metrics']['queryExecutor'].get('collectionScans')
+    except (PyMongoError, KeyError):
+        return None
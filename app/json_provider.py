@@ -0,0 +1,53 @@
+import datetime
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """app.json provider that encodes Mongo documents directly.
+
+    ObjectId is written as its hex string, and datetimes as ISO 8601 in UTC, so
+    routes can jsonify raw documents. When orjson is installed it does the
+    encoding and decoding; otherwise the stdlib json module is used with the
+    same conversions.
+    """
+    # Keys keep document order; ETags come from catalog versions, not the body
+    sort_keys = False
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime.datetime):
+            # Mongo returns naive UTC datetimes
+            return (o if o.tzinfo else o.replace(tzinfo=datetime.timezone.utc)).isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing stdlib options (cls, separators, ...) get the stdlib encoder
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,96 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from app import app
+
+# LOG_LEVEL applies to every `app.*` logger; LOG_LEVELS overrides single modules, e.g.
+# LOG_LEVELS="app.routes.cart_routes=DEBUG,app.cache=WARNING"
+app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+app.config['LOG_LEVELS'] = os.getenv('LOG_LEVELS', '')
+# Fraction of DEBUG records kept once debug logging is switched on
+app.config['LOG_DEBUG_SAMPLE_RATE'] = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+app.config['LOG_QUEUE_SIZE'] = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+def parse_module_levels(spec):
+    """Parse "logger=LEVEL,logger=LEVEL" into {logger: level}; raises ValueError."""
+    levels = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, level = part.partition('=')
+        level = level.strip().upper()
+        if not name.strip() or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid log level setting: {part.strip()}")
+        levels[name.strip()] = level
+    return levels
+
+class DebugSampler(logging.Filter):
+    """Keep every INFO+ record but only a `rate` fraction of DEBUG records."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread without formatting them or waiting.
+
+    Records stay in-process, so there is nothing to pickle and message formatting is
+    left to the listener. Callers pass scalars or snapshots as log args, never objects
+    they mutate afterwards. When the queue is full the record is dropped and counted
+    rather than blocking the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging():
+    module_levels = parse_module_levels(app.config['LOG_LEVELS'])
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+    listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(app.config['LOG_DEBUG_SAMPLE_RATE']))
+
+    # app.logger is the `app` logger too, so Flask's own error logs take the same path
+    logger = logging.getLogger('app')
+    logger.handlers = [queue_handler]
+    logger.setLevel(app.config['LOG_LEVEL'])
+    logger.propagate = False
+    for name, level in module_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    # Flush anything still queued on shutdown
+    atexit.register(listener.stop)
+
+    def restart_after_fork():
+        # The listener thread doesn't survive fork; each worker gets its own queue and listener
+        worker_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+        queue_handler.queue = worker_queue
+        worker_listener = logging.handlers.QueueListener(worker_queue, console, respect_handler_level=True)
+        worker_listener.start()
+        atexit.register(worker_listener.stop)
+    os.register_at_fork(after_in_child=restart_after_fork)
+    return queue_handler
+
+queue_handler = configure_logging()
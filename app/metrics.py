@@ -0,0 +1,183 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from flask import g, request
+from pymongo import monitoring
+from app import app
+
+logger = logging.getLogger(__name__)
+
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+app.config['MONGO_SLOW_QUERY_MS'] = float(os.getenv('MONGO_SLOW_QUERY_MS', 100))
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    """A labelled counter rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+class Histogram:
+    """A labelled histogram with fixed buckets, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labelnames, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, ("le", bound))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+http_request_duration = Histogram('http_request_duration_seconds', 'Request latency by blueprint and endpoint.',
+                                  ('blueprint', 'endpoint'), HTTP_BUCKETS)
+http_requests = Counter('http_requests_total', 'Requests by blueprint, endpoint, method and status.',
+                        ('blueprint', 'endpoint', 'method', 'status'))
+mongo_command_duration = Histogram('mongo_command_duration_seconds', 'Mongo command latency by collection.',
+                                   ('collection', 'command'), MONGO_BUCKETS)
+mongo_command_documents = Counter('mongo_command_documents_total',
+                                  'Documents returned or written by Mongo commands.', ('collection', 'command'))
+mongo_command_failures = Counter('mongo_command_failures_total', 'Failed Mongo commands.',
+                                 ('collection', 'command'))
+ALL_METRICS = (http_request_duration, http_requests, mongo_command_duration,
+               mongo_command_documents, mongo_command_failures)
+
+def render_metrics():
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is None or not app.config['METRICS_ENABLED']:
+        return response
+    elapsed = time.perf_counter() - started
+    # Label by route rule, never by raw path, so the number of series stays bounded
+    endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+    blueprint = request.blueprint or 'app'
+    http_request_duration.observe((blueprint, endpoint), elapsed)
+    http_requests.inc((blueprint, endpoint, request.method, str(response.status_code)))
+    return response
+
+def _reply_documents(command_name, reply):
+    """How many documents a command returned or wrote, from its reply."""
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or [])
+    if command_name == 'findAndModify':
+        return 1 if reply.get('value') else 0
+    n = reply.get('n')
+    return n if isinstance(n, int) else 0
+
+def _command_shape(command_name, command):
+    """Field names (not values) of a command's filter or pipeline, for the slow-query log."""
+    if command_name == 'aggregate':
+        return [next(iter(stage), '') for stage in command.get('pipeline', [])]
+    for field in ('filter', 'query', 'q'):
+        if isinstance(command.get(field), dict):
+            return sorted(command[field])
+    if command_name in ('update', 'delete'):
+        statements = command.get('updates') or command.get('deletes') or []
+        if statements and isinstance(statements[0].get('q'), dict):
+            return sorted(statements[0]['q'])
+    return []
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records latency and document counts for every command sent by the Mongo client.
+
+    Commands slower than MONGO_SLOW_QUERY_MS are logged with their filter shape.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == 'getMore':
+            collection = event.command.get('collection')
+        if not isinstance(collection, str):
+            collection = '-'
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command)
+
+    def _finish(self, event):
+        with self._lock:
+            collection, command = self._pending.pop((event.connection_id, event.request_id), ('-', {}))
+        seconds = event.duration_micros / 1e6
+        mongo_command_duration.observe((collection, event.command_name), seconds)
+        if seconds * 1000 >= app.config['MONGO_SLOW_QUERY_MS']:
+            logger.warning("Slow Mongo %s on %s took %.1f ms (shape %s)", event.command_name, collection,
+                           seconds * 1000, _command_shape(event.command_name, command))
+        return collection
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        documents = _reply_documents(event.command_name, event.reply)
+        if documents:
+            mongo_command_documents.inc((collection, event.command_name), documents)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_command_failures.inc((collection, event.command_name))
+
+mongo_command_listener = MongoCommandMetrics()
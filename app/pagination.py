@@ -0,0 +1,90 @@
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Every sort order ends on _id so that ties are broken the same way on every page
+SORT_ORDERS = {
+    'newest': [('_id', -1)],
+    'oldest': [('_id', 1)],
+    'price_asc': [('price', 1), ('_id', 1)],
+    'price_desc': [('price', -1), ('_id', -1)],
+    'name': [('name', 1), ('_id', 1)],
+}
+DEFAULT_SORT = 'newest'
+
+# Fields needed to render a product card or list entry
+PRODUCT_LIST_PROJECTION = {
+    'name': 1,
+    'description': 1,
+    'price': 1,
+    'stock': 1,
+    'category': 1,
+    'images': 1,
+    'vendor_email': 1
+}
+
+def parse_page_args(args, default_limit=DEFAULT_PAGE_SIZE, allowed_sorts=None):
+    """Read after/limit/sort from request args.
+
+    Raises ValueError with a client-facing message when an argument is invalid.
+    """
+    after = args.get('after')
+    if after:
+        if not ObjectId.is_valid(after):
+            raise ValueError('Invalid cursor')
+        after = ObjectId(after)
+    else:
+        after = None
+
+    try:
+        limit = int(args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit value')
+    if limit < 1:
+        raise ValueError('Limit must be at least 1')
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    allowed_sorts = allowed_sorts or tuple(SORT_ORDERS)
+    sort = args.get('sort', DEFAULT_SORT)
+    if sort not in allowed_sorts:
+        raise ValueError(f"Invalid sort order. Must be one of: {', '.join(allowed_sorts)}")
+
+    return after, limit, sort
+
+def _keyset_filter(collection, sort_keys, after):
+    """Build the filter selecting documents that come strictly after `after`."""
+    id_op = '$gt' if sort_keys[-1][1] == 1 else '$lt'
+    if len(sort_keys) == 1:
+        return {'_id': {id_op: after}}
+
+    # Compound sort: look up the anchor's sort value so the cursor stays a plain _id
+    field, direction = sort_keys[0]
+    anchor = collection.find_one({'_id': after}, {field: 1})
+    if not anchor:
+        raise ValueError('Invalid cursor')
+    value = anchor.get(field)
+    op = '$gt' if direction == 1 else '$lt'
+    return {'$or': [
+        {field: {op: value}},
+        {field: value, '_id': {id_op: after}}
+    ]}
+
+def fetch_page(collection, query, after=None, limit=DEFAULT_PAGE_SIZE, sort=DEFAULT_SORT,
+               projection=None):
+    """Return (documents, next_cursor) for one keyset page of `query`.
+
+    next_cursor is the string _id of the last document, or None on the last page.
+    """
+    sort_keys = SORT_ORDERS[sort]
+    if after is not None:
+        keyset = _keyset_filter(collection, sort_keys, after)
+        query = {'$and': [query, keyset]} if query else keyset
+
+    # Fetch one extra document to find out whether another page exists
+    docs = list(collection.find(query, projection).sort(sort_keys).limit(limit + 1))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]['_id'])
+    return docs, next_cursor
@@ -0,0 +1,159 @@
+import os
+from urllib.parse import quote
+from flask import url_for
+
+DEFAULT_IMAGE_URL = '/static/images/default-product.png'
+# Fields every serialized product has, and the value used when a document lacks one
+PRODUCT_DEFAULTS = (
+    ('name', 'Unnamed Product'),
+    ('description', 'No description available'),
+    ('price', 0.0),
+    ('stock', 0),
+    ('category', 'Uncategorized')
+)
+REQUIRED_PRODUCT_FIELDS = ['name', 'price', 'description', 'category', 'stock']
+TEXT_PRODUCT_FIELDS = ('name', 'description', 'category')
+
+def _check_text_fields(data):
+    for field in TEXT_PRODUCT_FIELDS:
+        if field in data and not isinstance(data[field], str):
+            raise ValueError(f'{field} must be a string')
+
+def _normalize_images(images):
+    if isinstance(images, str):
+        return [images]
+    if not isinstance(images, list) or not all(isinstance(image, str) for image in images):
+        raise ValueError('images must be a string or a list of strings')
+    return images
+
+def validate_product(data):
+    """Check a new product's fields and return them normalized.
+
+    Shared by POST /api/products and the bulk importer so both accept exactly the
+    same rows. Raises ValueError with a client-facing message.
+    """
+    for field in REQUIRED_PRODUCT_FIELDS:
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+    _check_text_fields(data)
+
+    # Validate price and stock
+    try:
+        price = float(data['price'])
+        stock = int(data['stock'])
+    except (TypeError, ValueError):
+        raise ValueError('Invalid price or stock value')
+    if price <= 0 or stock < 0:
+        raise ValueError('Price and stock must be positive numbers')
+
+    # Set default image based on product name if no image provided
+    images = data.get('images', [])
+    if not images:
+        images = [f"/static/images/{data['name'].replace(' ', '_')}.png"]
+    else:
+        images = _normalize_images(images)
+
+    product = {
+        'name': data['name'],
+        'price': price,
+        'description': data['description'],
+        'category': data['category'],
+        'stock': stock,
+        'images': images
+    }
+    sku = data.get('sku')
+    if sku is not None and str(sku).strip():
+        product['sku'] = str(sku).strip()
+    return product
+
+def validate_product_update(data):
+    """Check the fields of a partial product update and return them normalized.
+
+    Only fields present in `data` are returned, so they can be $set directly.
+    Raises ValueError with a client-facing message.
+    """
+    _check_text_fields(data)
+    fields = {}
+    # Validate price and stock if provided
+    if 'price' in data:
+        try:
+            fields['price'] = float(data['price'])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid price value')
+        if fields['price'] <= 0:
+            raise ValueError('Price must be a positive number')
+
+    if 'stock' in data:
+        try:
+            fields['stock'] = int(data['stock'])
+        except (TypeError, ValueError):
+            raise ValueError('Invalid stock value')
+        if fields['stock'] < 0:
+            raise ValueError('Stock must be a non-negative number')
+
+    for field in ('name', 'description', 'category'):
+        if field in data:
+            fields[field] = data[field]
+    if 'images' in data:
+        fields['images'] = _normalize_images(data['images'])
+    return fields
+
+def image_url_builder(size=None):
+    """Return a function that maps a stored image path to its public URL.
+
+    The variant route is resolved once here rather than once per image.
+    """
+    variant_prefix = url_for('products.serve_image', filename='_')[:-1] if size else None
+
+    def image_url(image_path):
+        if not image_path:
+            return DEFAULT_IMAGE_URL
+        if image_path.startswith('http'):
+            return image_path
+        if variant_prefix:
+            # Resized variants are picked (WebP or JPEG) by serve_image
+            filename = os.path.basename(image_path).replace('%20', ' ').strip()
+            return f"{variant_prefix}{quote(filename)}?size={size}"
+        # Ensure the path starts with /static/images/
+        if not image_path.startswith('/static/images/'):
+            # Clean up the filename to match the actual files
+            filename = os.path.basename(image_path).replace('%20', ' ').strip()
+            return f"/static/images/{filename}"
+        return image_path
+    return image_url
+
+def get_image_url(image_path, size=None):
+    return image_url_builder(size)(image_path)
+
+# Bookkeeping fields that stay in the database and never reach clients
+INTERNAL_PRODUCT_FIELDS = ('stock_holds',)
+
+def _serialize(product, image_url):
+    product['_id'] = str(product['_id'])
+    for field in INTERNAL_PRODUCT_FIELDS:
+        product.pop(field, None)
+    for field, default in PRODUCT_DEFAULTS:
+        if field not in product:
+            product[field] = default
+    images = product.get('images')
+    if isinstance(images, str):
+        images = [images]
+    product['images'] = [image_url(image) for image in images if image] if images else []
+    if not product['images']:
+        product['images'] = [DEFAULT_IMAGE_URL]
+    return product
+
+def serialize_product(product, image_size=None):
+    """Normalize a product document in place for JSON responses and templates.
+
+    Stringifies _id, fills PRODUCT_DEFAULTS and rewrites images to public URLs
+    (resized variants when `image_size` is given), in one pass over the document.
+    """
+    return _serialize(product, image_url_builder(image_size))
+
+def serialize_products(products, image_size=None):
+    """serialize_product for a list, building the image URL function only once."""
+    image_url = image_url_builder(image_size)
+    for product in products:
+        _serialize(product, image_url)
+    return products
@@ -0,0 +1,79 @@
+import logging
+import os
+import pymongo
+from flask import g, jsonify, request
+from pymongo.errors import PyMongoError
+from app import app
+
+logger = logging.getLogger(__name__)
+
+# Every request runs its Mongo queries under one time budget (pymongo.timeout, which
+# sends the remaining time as maxTimeMS). MONGO_QUERY_TIMEOUT_MS applies to endpoints
+# without an entry of their own; MONGO_QUERY_TIMEOUTS overrides single endpoints, e.g.
+# MONGO_QUERY_TIMEOUTS="products.search_products=5000,vendor.get_vendor_stats=0" (0 = no limit)
+app.config['MONGO_QUERY_TIMEOUT_MS'] = int(os.getenv('MONGO_QUERY_TIMEOUT_MS', 5000))
+app.config['MONGO_QUERY_TIMEOUTS'] = os.getenv('MONGO_QUERY_TIMEOUTS', '')
+# Seconds clients are told to wait before retrying a request that ran out of time
+app.config['QUERY_TIMEOUT_RETRY_AFTER'] = int(os.getenv('QUERY_TIMEOUT_RETRY_AFTER', 2))
+
+# Catalog reads are on the hot path and cached, so they get tight budgets
+DEFAULT_QUERY_TIMEOUTS_MS = {
+    'index': 2000,
+    'products.get_products': 2000,
+    'products.search_products': 3000,
+    'products.autocomplete_products': 1000,
+    'products.get_product': 1000,
+    'products.get_featured_products': 1000,
+}
+
+def parse_query_timeouts(spec):
+    """Parse "endpoint=ms,endpoint=ms" into {endpoint: ms}; raises ValueError."""
+    timeouts = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        endpoint, sep, value = entry.partition('=')
+        if not sep or not endpoint.strip():
+            raise ValueError(f'Invalid MONGO_QUERY_TIMEOUTS entry: {entry!r}')
+        try:
+            timeouts[endpoint.strip()] = int(value)
+        except ValueError:
+            raise ValueError(f'Invalid timeout for {endpoint.strip()}: {value!r}')
+    return timeouts
+
+query_timeouts = {**DEFAULT_QUERY_TIMEOUTS_MS, **parse_query_timeouts(app.config['MONGO_QUERY_TIMEOUTS'])}
+
+def budget_ms(endpoint):
+    return query_timeouts.get(endpoint, app.config['MONGO_QUERY_TIMEOUT_MS'])
+
+def is_query_timeout(error):
+    """True for driver errors caused by the request's time budget (or an unreachable server)."""
+    return isinstance(error, PyMongoError) and error.timeout
+
+def retry_after_headers():
+    return {'Retry-After': str(app.config['QUERY_TIMEOUT_RETRY_AFTER'])}
+
+def query_timeout_response():
+    """503 for a request whose queries ran out of time; the client may retry shortly."""
+    logger.warning("Query budget of %d ms exceeded on %s", budget_ms(request.endpoint), request.endpoint)
+    return jsonify({'error': 'The database is taking too long to respond, please retry shortly'}), 503, \
+        retry_after_headers()
+
+@app.before_request
+def start_query_budget():
+    budget = budget_ms(request.endpoint)
+    if budget > 0:
+        g.query_budget = pymongo.timeout(budget / 1000)
+        g.query_budget.__enter__()
+
+@app.teardown_request
+def end_query_budget(exc):
+    budget = g.pop('query_budget', None)
+    if budget is not None:
+        budget.__exit__(None, None, None)
+
+@app.errorhandler(PyMongoError)
+def handle_mongo_error(error):
+    # Routes without their own catch-all let driver errors propagate to here
+    if is_query_timeout(error):
+        return query_timeout_response()
+    logger.exception("Unhandled database error on %s", request.endpoint)
+    return jsonify({'error': 'Database error'}), 500
@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.health import get_db_stats, mongo_pinger
+from app.query_budget import is_query_timeout, query_timeout_response
+import logging
+
+bp = Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
+
+@bp.route('/db-stats', methods=['GET'])
+@jwt_required()
+def get_database_stats():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'admin':
+        return jsonify({'error': 'Only admins can view database stats'}), 403
+    
+    try:
+        mongo_pinger.ensure_started()
+        _, ping = mongo_pinger.status()
+        return jsonify({'database': get_db_stats(), 'ping': ping}), 200
+    except Exception as e:
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in get_database_stats")
+        return jsonify({'error': 'Error loading database stats', 'details': str(e)}), 500
@@ -2,9 +2,12 @@ from flask import Blueprint, request, jsonify, render_template
 from flask_jwt_extended import create_access_token
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import mongo
+from app.query_budget import is_query_timeout, query_timeout_response
 import datetime
+import logging
 
 bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -41,7 +44,9 @@ def login():
         }), 200
         
     except Exception as e:
-        print(f"Error in login: {str(e)}")
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in login")
         return jsonify({'error': 'Login failed', 'details': str(e)}), 500
 
 @bp.route('/register', methods=['GET', 'POST'])
@@ -83,5 +88,7 @@ def register():
         return jsonify({'message': 'User registered successfully'}), 201
         
     except Exception as e:
-        print(f"Error in register: {str(e)}")
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in register")
         return jsonify({'error': 'Registration failed', 'details': str(e)}), 500 
\ No newline at end of file
@@ -1,26 +1,69 @@
 from flask import Blueprint, jsonify, request, current_app
 from bson import ObjectId
-import traceback
+import logging
 from app import mongo
+from app.products import serialize_products
+from app.query_budget import is_query_timeout, query_timeout_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import os
+from pymongo import ReturnDocument
 from datetime import datetime
 
 cart = Blueprint('cart', __name__)
+logger = logging.getLogger(__name__)
 
-def get_image_url(image_path):
-    if not image_path:
-        return '/static/images/default-product.png'
-    if image_path.startswith('http'):
-        return image_path
-    # Ensure the path starts with /static/images/
-    if not image_path.startswith('/static/images/'):
-        # Clean up the filename to match the actual files
-        filename = os.path.basename(image_path)
-        # Remove any URL encoding and spaces
-        filename = filename.replace('%20', ' ').strip()
-        return f"/static/images/{filename}"
-    return image_path
+def populate_cart_items(items):
+    """Attach product details to cart items using a single $in query.
+
+    Items whose product no longer exists are dropped.
+    """
+    product_ids = []
+    for item in items:
+        try:
+            product_ids.append(ObjectId(item['product_id']) if isinstance(item['product_id'], str) else item['product_id'])
+        except Exception as e:
+            logger.warning("Error processing cart item: %s", e)
+    
+    products = {}
+    if product_ids:
+        found = serialize_products(list(mongo.db.products.find({'_id': {'$in': product_ids}})))
+        products = {product['_id']: product for product in found}
+    
+    populated_items = []
+    for item in items:
+        product = products.get(str(item['product_id']))
+        if product:
+            item['product_id'] = product['_id']
+            item['product'] = product
+            populated_items.append(item)
+        else:
+            logger.debug("Product not found for ID: %s", item['product_id'])
+    return populated_items
+
+def cart_response(cart):
+    """Build the cart JSON from a cart document returned by a write."""
+    cart['_id'] = str(cart['_id'])
+    # Populate product details for every item in one round trip
+    cart['items'] = populate_cart_items(cart.get('items', []))
+    return jsonify(cart)
+
+def set_item_pipeline(product_id, quantity, now):
+    """Update pipeline that sets an item's quantity, appending the item if it's missing.
+
+    Run as an upsert, it also creates the cart, so adding an item is one atomic
+    round trip: concurrent adds from two tabs can't overwrite each other's items.
+    """
+    items = {'$ifNull': ['$items', []]}
+    item = {'product_id': product_id, 'quantity': quantity}
+    return [{'$set': {
+        'created_at': {'$ifNull': ['$created_at', now]},
+        'updated_at': now,
+        'items': {'$cond': [
+            {'$in': [product_id, {'$map': {'input': items, 'as': 'item', 'in': '$$item.product_id'}}]},
+            {'$map': {'input': items, 'as': 'item', 'in': {
+                '$cond': [{'$eq': ['$$item.product_id', product_id]}, item, '$$item']}}},
+            {'$concatArrays': [items, [item]]}
+        ]}
+    }}]
 
 @cart.route('/', methods=['GET'])
 @jwt_required()
@@ -28,57 +71,22 @@ def get_cart():
     try:
         current_user = get_jwt_identity()
         user_email = current_user['email'] if isinstance(current_user, dict) else current_user
-        print("Getting cart for user:", user_email)
         
-        # Get user's cart from MongoDB using email
+        # Get user's cart; only a first visit writes, creating an empty one
         cart = mongo.db.carts.find_one({'user_email': user_email})
-        print("Found cart:", cart)
-        
-        if not cart:
-            print("Creating new cart for user")
-            # Create empty cart with proper structure
-            cart = {
-                'user_email': user_email,
-                'items': [],
-                'created_at': datetime.utcnow(),
-                'updated_at': datetime.utcnow()
-            }
-            try:
-                result = mongo.db.carts.insert_one(cart)
-                print("New cart created with ID:", result.inserted_id)
-                cart['_id'] = str(result.inserted_id)
-            except Exception as e:
-                print(f"Error creating cart: {str(e)}")
-                return jsonify({'error': 'Failed to create cart'}), 500
-        else:
-            cart['_id'] = str(cart['_id'])
-        
-        # Populate product details for each item
-        populated_items = []
-        for item in cart.get('items', []):
-            try:
-                product_id = ObjectId(item['product_id']) if isinstance(item['product_id'], str) else item['product_id']
-                product = mongo.db.products.find_one({'_id': product_id})
-                if product:
-                    product['_id'] = str(product['_id'])
-                    # Handle product images
-                    if 'images' in product:
-                        product['images'] = [get_image_url(img) for img in product['images']]
-                    else:
-                        product['images'] = ['/static/images/default-product.png']
-                    item['product'] = product
-                    populated_items.append(item)
-                else:
-                    print(f"Product not found for ID: {item['product_id']}")
-            except Exception as e:
-                print(f"Error processing cart item: {str(e)}")
-                continue
-        
-        cart['items'] = populated_items
-        return jsonify(cart)
+        if cart is None:
+            now = datetime.utcnow()
+            cart = mongo.db.carts.find_one_and_update(
+                {'user_email': user_email},
+                {'$setOnInsert': {'items': [], 'created_at': now, 'updated_at': now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        return cart_response(cart)
     except Exception as e:
-        print(f"Error in get_cart: {str(e)}")
-        traceback.print_exc()
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in get_cart")
         return jsonify({'error': 'Failed to retrieve cart'}), 500
 
 @cart.route('/', methods=['POST'])
@@ -86,101 +94,57 @@ def get_cart():
 def add_to_cart():
     try:
         current_user = get_jwt_identity()
-        print("Current user identity:", current_user)
-        
         user_email = current_user['email'] if isinstance(current_user, dict) else current_user
-        print("Adding to cart for user:", user_email)
             
         data = request.get_json()
-        print("Request data:", data)
         
         if not data or 'product_id' not in data:
-            print("Missing product_id in request data")
             return jsonify({'error': 'Product ID is required'}), 400
         
         try:
             product_id = ObjectId(data['product_id'])
         except Exception as e:
-            print(f"Invalid product ID: {str(e)}")
             return jsonify({'error': 'Invalid product ID format'}), 400
         
         quantity = int(data.get('quantity', 1))
         if quantity < 1:
-            print("Invalid quantity:", quantity)
             return jsonify({'error': 'Quantity must be at least 1'}), 400
         
         # Check if product exists and has enough stock
         try:
             product = mongo.db.products.find_one({'_id': product_id})
-            print("Found product:", product)
             
             if not product:
-                print(f"Product not found with ID: {product_id}")
                 return jsonify({'error': 'Product not found'}), 404
             
             if product.get('stock', 0) < quantity:
-                print(f"Insufficient stock. Available: {product.get('stock', 0)}, Requested: {quantity}")
                 return jsonify({'error': 'Not enough stock available'}), 400
         except Exception as e:
-            print(f"Error checking product: {str(e)}")
+            if is_query_timeout(e):
+                return query_timeout_response()
+            logger.exception("Error checking product")
             return jsonify({'error': 'Failed to check product availability'}), 500
         
-        # Get or create user's cart
-        try:
-            cart = mongo.db.carts.find_one({'user_email': user_email})
-            print("Found existing cart:", cart)
-            
-            if not cart:
-                print("Creating new cart")
-                cart = {
-                    'user_email': user_email,
-                    'items': [],
-                    'created_at': datetime.utcnow(),
-                    'updated_at': datetime.utcnow()
-                }
-                result = mongo.db.carts.insert_one(cart)
-                cart['_id'] = result.inserted_id
-                print("New cart created with ID:", cart['_id'])
-        except Exception as e:
-            print(f"Error getting/creating cart: {str(e)}")
-            return jsonify({'error': 'Failed to get/create cart'}), 500
-        
-        # Check if product already in cart
-        item_found = False
-        for item in cart['items']:
-            if str(item['product_id']) == str(product_id):
-                item['quantity'] = quantity
-                item_found = True
-                break
-        
-        if not item_found:
-            cart['items'].append({
-                'product_id': product_id,
-                'quantity': quantity
-            })
-        
-        # Update cart in database
-        print("Updating cart with items:", cart['items'])
+        # Set the item's quantity (adding it, and the cart, if needed) in one atomic upsert
         try:
-            result = mongo.db.carts.update_one(
-                {'_id': cart['_id']},
-                {
-                    '$set': {
-                        'items': cart['items'],
-                        'updated_at': datetime.utcnow()
-                    }
-                }
+            cart = mongo.db.carts.find_one_and_update(
+                {'user_email': user_email},
+                set_item_pipeline(product_id, quantity, datetime.utcnow()),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
             )
-            print("Update result:", result.modified_count)
         except Exception as e:
-            print(f"Error updating cart: {str(e)}")
+            if is_query_timeout(e):
+                return query_timeout_response()
+            logger.exception("Error updating cart")
             return jsonify({'error': 'Failed to update cart in database'}), 500
         
         # Return updated cart with product details
-        return get_cart()
+        return cart_response(cart)
     except Exception as e:
-        print(f"Error in add_to_cart: {str(e)}")
-        traceback.print_exc()
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in add_to_cart")
         return jsonify({'error': 'Failed to add item to cart'}), 500
 
 @cart.route('/', methods=['PUT'])
@@ -211,27 +175,25 @@ def update_cart():
         if product.get('stock', 0) < quantity:
             return jsonify({'error': 'Not enough stock available'}), 400
         
-        # Update cart
-        result = mongo.db.carts.update_one(
+        # Update the item only if it's already in the cart, reading the cart back in the same round trip
+        cart = mongo.db.carts.find_one_and_update(
             {
                 'user_email': user_email,
                 'items.product_id': product_id
             },
-            {
-                '$set': {
-                    'items.$.quantity': quantity
-                }
-            }
+            set_item_pipeline(product_id, quantity, datetime.utcnow()),
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count == 0:
+        if not cart:
             return jsonify({'error': 'Item not found in cart'}), 404
         
         # Return updated cart
-        return get_cart()
+        return cart_response(cart)
     except Exception as e:
-        print(f"Error in update_cart: {str(e)}")
-        traceback.print_exc()
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in update_cart")
         return jsonify({'error': 'Failed to update cart'}), 500
 
 @cart.route('/', methods=['DELETE'])
@@ -251,17 +213,19 @@ def remove_from_cart():
             return jsonify({'error': 'Invalid product ID format'}), 400
             
         # Remove item from cart
-        result = mongo.db.carts.update_one(
-            {'user_email': user_email},
-            {'$pull': {'items': {'product_id': product_id}}}
+        cart = mongo.db.carts.find_one_and_update(
+            {'user_email': user_email, 'items.product_id': product_id},
+            {'$pull': {'items': {'product_id': product_id}}, '$set': {'updated_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count == 0:
+        if not cart:
             return jsonify({'error': 'Item not found in cart'}), 404
             
         # Return updated cart
-        return get_cart()
+        return cart_response(cart)
     except Exception as e:
-        print(f"Error in remove_from_cart: {str(e)}")
-        traceback.print_exc()
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in remove_from_cart")
         return jsonify({'error': 'Failed to remove item from cart'}), 500 
\ No newline at end of file
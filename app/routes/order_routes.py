@@ -1,23 +1,147 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import mongo
+from app.catalog import bump_catalog_version
+from app.pagination import parse_page_args, fetch_page
+from app.vendor_stats import record_order, record_status_change, ORDER_STATUSES
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
 import datetime
 
 bp = Blueprint('orders', __name__)
 
+# Orders are always listed by _id so paging uses the (owner, _id) indexes
+ORDER_SORTS = ('newest', 'oldest')
+
+class OutOfStockError(Exception):
+    def __init__(self, items):
+        super().__init__('Some items are out of stock')
+        self.items = items
+
+def supports_transactions():
+    """Multi-document transactions need a replica set or sharded cluster."""
+    return mongo.cx.topology_description.topology_type_name in ('ReplicaSetWithPrimary', 'Sharded')
+
+def describe_shortfall(item, product):
+    return {
+        'product_id': str(item['product_id']),
+        'name': product.get('name') if product else None,
+        'requested': item['quantity'],
+        'available': product.get('stock', 0) if product else 0
+    }
+
+def stock_shortfalls(items, products):
+    """Return the items whose product is missing or doesn't have enough stock."""
+    return [
+        describe_shortfall(item, products.get(item['product_id']))
+        for item in items
+        if products.get(item['product_id'], {}).get('stock', 0) < item['quantity']
+    ]
+
+def place_order_in_transaction(order, items):
+    """Insert the order, decrement stock and clear the cart atomically."""
+    def checkout(session):
+        result = mongo.db.products.bulk_write([
+            UpdateOne({'_id': item['product_id'], 'stock': {'$gte': item['quantity']}},
+                      {'$inc': {'stock': -item['quantity'], 'version': 1}})
+            for item in items
+        ], ordered=True, session=session)
+        if result.matched_count < len(items):
+            # Aborts the transaction; the items are worked out below from pre-write stock
+            raise OutOfStockError([])
+        mongo.db.orders.insert_one(order, session=session)
+        mongo.db.carts.delete_one({'user_email': order['user_email']}, session=session)
+
+    with mongo.cx.start_session() as session:
+        try:
+            session.with_transaction(checkout)
+        except OutOfStockError:
+            # Read after the abort, so decrements that did match aren't counted against stock
+            products = {p['_id']: p for p in mongo.db.products.find(
+                {'_id': {'$in': [item['product_id'] for item in items]}}, {'name': 1, 'stock': 1})}
+            raise OutOfStockError(stock_shortfalls(items, products))
+
+def release_stock_holds(hold, product_ids):
+    """Drop an order's hold from `stock_holds`, removing the field once it is empty."""
+    mongo.db.products.update_many({'_id': {'$in': product_ids}, 'stock_holds': hold},
+                                  {'$pull': {'stock_holds': hold}})
+    mongo.db.products.update_many({'_id': {'$in': product_ids}, 'stock_holds': {'$size': 0}},
+                                  {'$unset': {'stock_holds': ''}})
+
+def place_order_without_transaction(order, items):
+    """Decrement stock with guarded updates, rolling back on a shortfall.
+
+    Each decrement records the order id in `stock_holds` so that a partial
+    failure can restore exactly the products that were decremented.
+    """
+    hold = str(order['_id'])
+    product_ids = [item['product_id'] for item in items]
+    result = mongo.db.products.bulk_write([
+        UpdateOne({'_id': item['product_id'], 'stock': {'$gte': item['quantity']}},
+                  {'$inc': {'stock': -item['quantity'], 'version': 1}, '$push': {'stock_holds': hold}})
+        for item in items
+    ], ordered=True)
+
+    if result.matched_count < len(items):
+        held = {p['_id'] for p in mongo.db.products.find(
+            {'_id': {'$in': product_ids}, 'stock_holds': hold}, {'_id': 1})}
+        if held:
+            mongo.db.products.bulk_write([
+                UpdateOne({'_id': item['product_id'], 'stock_holds': hold},
+                          {'$inc': {'stock': item['quantity'], 'version': 1}, '$pull': {'stock_holds': hold}})
+                for item in items if item['product_id'] in held
+            ], ordered=False)
+            release_stock_holds(hold, list(held))
+        # Read after the rollback, so only stock this order didn't take is compared
+        products = {p['_id']: p for p in mongo.db.products.find(
+            {'_id': {'$in': product_ids}}, {'name': 1, 'stock': 1})}
+        shortfalls = stock_shortfalls(items, products)
+        if not shortfalls:
+            # Stock came back concurrently; report the items whose guard failed
+            shortfalls = [describe_shortfall(item, products.get(item['product_id']))
+                          for item in items if item['product_id'] not in held]
+        raise OutOfStockError(shortfalls)
+
+    mongo.db.orders.insert_one(order)
+    release_stock_holds(hold, product_ids)
+    mongo.db.carts.delete_one({'user_email': order['user_email']})
+
 @bp.route('/', methods=['POST'])
 @jwt_required()
 def create_order():
     current_user = get_jwt_identity()
-    data = request.get_json()
+    data = request.get_json() or {}
+    
+    if 'shipping_address' not in data:
+        return jsonify({'error': 'Missing required field: shipping_address'}), 400
     
     # Get cart
     cart = mongo.db.carts.find_one({'user_email': current_user['email']})
     if not cart or not cart['items']:
         return jsonify({'error': 'Cart is empty'}), 400
     
+    items = [{
+        'product_id': ObjectId(item['product_id']) if isinstance(item['product_id'], str) else item['product_id'],
+        'quantity': int(item['quantity'])
+    } for item in cart['items']]
+    
+    # Load every product in the cart in one round trip and fail fast on missing stock
+    products = {p['_id']: p for p in mongo.db.products.find(
+        {'_id': {'$in': [item['product_id'] for item in items]}},
+        {'name': 1, 'price': 1, 'stock': 1, 'vendor_email': 1})}
+    shortfalls = stock_shortfalls(items, products)
+    if shortfalls:
+        return jsonify({'error': 'Some items are out of stock', 'items': shortfalls}), 409
+    
+    # Snapshot name, price and vendor so later product edits don't change the order
+    for item in items:
+        product = products[item['product_id']]
+        item['name'] = product.get('name')
+        item['price'] = float(product.get('price', 0))
+        item['vendor_email'] = product.get('vendor_email')
+    
     # Calculate total amount
-    total_amount = sum(item['price'] * item['quantity'] for item in cart['items'])
+    total_amount = sum(item['price'] * item['quantity'] for item in items)
     
     # Apply coupon if provided
     if 'coupon_code' in data:
@@ -27,52 +151,66 @@ def create_order():
     
     # Create order
     order = {
+        '_id': ObjectId(),
         'user_email': current_user['email'],
-        'items': cart['items'],
+        'items': items,
+        # Denormalized so vendors can find their orders through one index
+        'vendor_emails': sorted({item['vendor_email'] for item in items if item['vendor_email']}),
         'total_amount': total_amount,
         'status': 'pending',
         'created_at': datetime.datetime.utcnow(),
         'shipping_address': data['shipping_address']
     }
     
-    # Insert order
-    mongo.db.orders.insert_one(order)
-    
-    # Update product stock
-    for item in cart['items']:
-        mongo.db.products.update_one(
-            {'_id': item['product_id']},
-            {'$inc': {'stock': -item['quantity']}}
-        )
+    # Insert order, decrement stock with a guard against overselling and clear the cart
+    try:
+        if supports_transactions():
+            place_order_in_transaction(order, items)
+        else:
+            place_order_without_transaction(order, items)
+    except OutOfStockError as e:
+        return jsonify({'error': 'Some items are out of stock', 'items': e.items}), 409
     
-    # Clear cart
-    mongo.db.carts.delete_one({'user_email': current_user['email']})
+    # Listings show stock, so their ETags and cached pages must change with it; the
+    # purchased products' own versions were already $inc'd by the stock updates
+    bump_catalog_version(*[item['product_id'] for item in items])
+    record_order(order)
     
-    return jsonify({'message': 'Order created successfully'}), 201
+    return jsonify({'message': 'Order created successfully', 'order_id': str(order['_id'])}), 201
+
+def serialize_order(order):
+    order['_id'] = str(order['_id'])
+    for item in order.get('items', []):
+        item['product_id'] = str(item['product_id'])
+    return order
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
 def get_orders():
     current_user = get_jwt_identity()
     
+    try:
+        after, limit, sort = parse_page_args(request.args, allowed_sorts=ORDER_SORTS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if current_user['role'] == 'vendor':
         # Get all orders containing vendor's products
-        orders = list(mongo.db.orders.find({
-            'items.product_id': {'$in': [
-                product['_id'] for product in mongo.db.products.find(
-                    {'vendor_email': current_user['email']},
-                    {'_id': 1}
-                )
-            ]}
-        }, {'_id': 0}))
+        query = {'vendor_emails': current_user['email']}
     else:
         # Get customer's orders
-        orders = list(mongo.db.orders.find(
-            {'user_email': current_user['email']},
-            {'_id': 0}
-        ))
+        query = {'user_email': current_user['email']}
     
-    return jsonify(orders), 200
+    try:
+        orders, next_cursor = fetch_page(mongo.db.orders, query, after=after, limit=limit, sort=sort)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'orders': [serialize_order(order) for order in orders],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }), 200
 
 @bp.route('/<order_id>', methods=['PUT'])
 @jwt_required()
@@ -81,16 +219,26 @@ def update_order_status(order_id):
     if current_user['role'] != 'vendor':
         return jsonify({'error': 'Only vendors can update order status'}), 403
     
-    data = request.get_json()
+    data = request.get_json() or {}
+    if 'status' not in data:
+        return jsonify({'error': 'Missing required field: status'}), 400
     new_status = data['status']
+    if new_status not in ORDER_STATUSES:
+        return jsonify({'error': f"status must be one of: {', '.join(ORDER_STATUSES)}"}), 400
+    
+    if not ObjectId.is_valid(order_id):
+        return jsonify({'error': 'Invalid order ID'}), 400
     
-    # Update order status
-    result = mongo.db.orders.update_one(
-        {'_id': order_id},
-        {'$set': {'status': new_status}}
+    # Update order status, reading back the previous status for the vendor rollups
+    order = mongo.db.orders.find_one_and_update(
+        {'_id': ObjectId(order_id)},
+        {'$set': {'status': new_status}},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not order:
         return jsonify({'error': 'Order not found'}), 404
     
+    record_status_change(order, order.get('status'), new_status)
+    
     return jsonify({'message': 'Order status updated successfully'}), 200 
\ No newline at end of file
@@ -1,81 +1,221 @@
-from flask import Blueprint, request, jsonify, current_app, render_template, send_from_directory
+from flask import Blueprint, request, jsonify, render_template, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import mongo
+from app import mongo, catalog_cache
+from app.pagination import parse_page_args, fetch_page, PRODUCT_LIST_PROJECTION, MAX_PAGE_SIZE
+from app.search import autocomplete_index, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS
+from app.catalog import (get_catalog_version, get_product_version, bump_catalog_version,
+                         make_etag, request_matches_etag, not_modified_response, with_etag, catalog_db)
+from app.images import (IMAGE_SIZES, DEFAULT_IMAGE, save_upload, schedule_variants, find_variant,
+                        images_dir, variants_dir, is_content_hashed)
+from app.assets import cache_forever
+from app.products import validate_product, validate_product_update, get_image_url, serialize_product, serialize_products
+from app.fragments import render_fragment, FRAGMENT_NAMESPACE
+from app.featured import featured_ranking
+from app.query_budget import is_query_timeout, query_timeout_response, retry_after_headers
+from werkzeug.exceptions import NotFound
 from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import datetime
-import traceback
-import os
-from werkzeug.utils import secure_filename
+import logging
 
 bp = Blueprint('products', __name__)
+logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+FEATURED_PAGE_SIZE = 6
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_OFFSET = 1000
+MAX_BATCH_OPERATIONS = 500
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+# Fields update_product returns for the updated product
+PRODUCT_UPDATE_PROJECTION = {'_id': 1, 'name': 1, 'price': 1, 'description': 1, 'category': 1,
+                             'stock': 1, 'images': 1, 'updated_at': 1}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def get_image_url(image_path):
-    if not image_path:
-        return '/static/images/default-product.png'
-    if image_path.startswith('http'):
-        return image_path
-    # Ensure the path starts with /static/images/
-    if not image_path.startswith('/static/images/'):
-        # Clean up the filename to match the actual files
-        filename = os.path.basename(image_path)
-        # Remove any URL encoding and spaces
-        filename = filename.replace('%20', ' ').strip()
-        return f"/static/images/{filename}"
-    return image_path
+def parse_image_size(args):
+    """Read the optional image_size arg; raises ValueError for unknown sizes."""
+    size = args.get('image_size')
+    if size and size not in IMAGE_SIZES:
+        raise ValueError(f"Invalid image size. Must be one of: {', '.join(IMAGE_SIZES)}")
+    return size or None
+
+def invalidate_catalog_cache(*product_ids):
+    """Bump the catalog version and drop cached entries after product writes."""
+    bump_catalog_version(*product_ids)
+    if len(product_ids) == 1:
+        catalog_cache.invalidate_prefix('product', str(product_ids[0]))
+    else:
+        # One pass over the cache instead of one per product
+        catalog_cache.invalidate_prefix('product')
+    for namespace in ('products', 'featured', FRAGMENT_NAMESPACE):
+        catalog_cache.invalidate_prefix(namespace)
 
 @bp.route('/images/<path:filename>')
 def serve_image(filename):
+    # The URL path is already decoded, so filenames with spaces arrive as-is
+    size = request.args.get('size')
+    sized = size in IMAGE_SIZES
+    if sized:
+        variant = find_variant(filename, size, request.accept_mimetypes['image/webp'] > 0)
+        if variant:
+            response = send_from_directory(variants_dir(), variant)
+            response.vary.add('Accept')
+            if is_content_hashed(variant):
+                cache_forever(response)
+            return response
     try:
-        # Decode URL-encoded filename
-        filename = filename.replace('%20', ' ')
-        return send_from_directory(os.path.join(current_app.root_path, 'static', 'images'), filename)
-    except Exception as e:
-        print(f"Error serving image {filename}: {str(e)}")
-        return send_from_directory(os.path.join(current_app.root_path, 'static', 'images'), 'default-product.png')
+        response = send_from_directory(images_dir(), filename)
+    except NotFound:
+        # Serve the placeholder, but never let it be cached under this image's URL
+        response = send_from_directory(images_dir(), DEFAULT_IMAGE)
+        response.cache_control.no_store = True
+        return response
+    if sized:
+        # The variant isn't built yet (usually just after upload): the original stands in,
+        # so clients must revalidate and pick up the variant once it exists
+        response.vary.add('Accept')
+        response.cache_control.no_cache = True
+    elif is_content_hashed(filename):
+        cache_forever(response)
+    return response
 
 @bp.route('/', methods=['GET'])
 def get_products():
     try:
+        try:
+            after, limit, sort = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        query = {}
         category = request.args.get('category')
-        query = {'category': category} if category else {}
+        if category:
+            query['category'] = category
+        vendor_email = request.args.get('vendor_email')
+        if vendor_email:
+            query['vendor_email'] = vendor_email
         
-        # Get all products from MongoDB
-        products = list(mongo.db.products.find(query))
+        # Check if this is a direct browser request or an API request
+        wants_json = request.headers.get('Accept') == 'application/json' or request.is_json
+        # Rendered pages show card-sized images; API clients opt in with image_size
+        image_size = parse_image_size(request.args) or (None if wants_json else 'card')
         
-        # Convert ObjectId to string and ensure images are properly formatted
-        for product in products:
-            product['_id'] = str(product['_id'])
-            # Handle product images
-            if 'images' in product and product['images']:
-                product['images'] = [get_image_url(img) for img in product['images']]
-            else:
-                product['images'] = ['/static/images/default-product.png']
-            
-            # Ensure all required fields are present
-            product.setdefault('name', 'Unnamed Product')
-            product.setdefault('description', 'No description available')
-            product.setdefault('price', 0.0)
-            product.setdefault('stock', 0)
-            product.setdefault('category', 'Uncategorized')
-            
-            print(f"Product {product['name']} using images: {product['images']}")  # Debug print
+        # JSON pages only change when the catalog version does, so answer
+        # revalidation requests before loading any products
+        version = get_catalog_version()
+        etag = make_etag('products', version, category, vendor_email, after, limit, sort, image_size)
+        if wants_json and request_matches_etag(etag):
+            return not_modified_response(etag)
         
-        # Check if this is a direct browser request or an API request
-        if request.headers.get('Accept') == 'application/json' or request.is_json:
-            return jsonify(products)
+        def load_page():
+            # Get one page of products from MongoDB; the primary, as the page is cached under `version`
+            products, next_cursor = fetch_page(mongo.db.products, query, after=after, limit=limit,
+                                               sort=sort, projection=PRODUCT_LIST_PROJECTION)
+            serialize_products(products, image_size)
+            logger.debug("Loaded %d products (category=%s, vendor=%s, after=%s)",
+                         len(products), category, vendor_email, after)
+            return products, next_cursor
+        
+        if wants_json:
+            cache_key = ('products', version, category, vendor_email, after, limit, sort, image_size)
+            products, next_cursor = catalog_cache.get_or_load(cache_key, load_page)
+            return with_etag(jsonify({
+                'products': products,
+                'next_cursor': next_cursor,
+                'limit': limit,
+                'sort': sort
+            }), etag)
+        
+        # For browser requests, render the page around the cached product grid
+        def grid_context():
+            products, next_cursor = load_page()
+            return dict(products=products, next_cursor=next_cursor, limit=limit, sort=sort, category=category)
         
-        # For browser requests, render the template
-        return render_template('products.html', products=products)
+        products_html = render_fragment('fragments/product_grid.html',
+                                        (category, vendor_email, after, limit, sort, image_size), grid_context)
+        return render_template('products.html', products_html=products_html)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error in get_products: {str(e)}")
-        print(traceback.format_exc())
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in get_products")
         return jsonify({'error': 'Error loading products', 'details': str(e)}), 500
 
+@bp.route('/search', methods=['GET'])
+def search_products():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Missing search query: q'}), 400
+        try:
+            limit = min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), MAX_PAGE_SIZE)
+            offset = int(request.args.get('offset', 0))
+            if limit < 1 or offset < 0 or offset > MAX_SEARCH_OFFSET:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': f'limit must be positive and offset between 0 and {MAX_SEARCH_OFFSET}'}), 400
+        
+        try:
+            image_size = parse_image_size(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = {'$text': {'$search': q}}
+        category = request.args.get('category')
+        if category:
+            query['category'] = category
+        
+        # Rank by text score (name matches weigh most), newest first on ties
+        projection = dict(PRODUCT_LIST_PROJECTION, score={'$meta': 'textScore'})
+        cursor = catalog_db().products.find(query, projection).sort(
+            [('score', {'$meta': 'textScore'}), ('_id', -1)]
+        ).skip(offset).limit(limit + 1)
+        products = list(cursor)
+        
+        has_more = len(products) > limit
+        products = products[:limit]
+        serialize_products(products, image_size)
+        
+        return jsonify({
+            'query': q,
+            'products': products,
+            'limit': limit,
+            'offset': offset,
+            'next_offset': offset + limit if has_more and offset + limit <= MAX_SEARCH_OFFSET else None
+        })
+    except Exception as e:
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in search_products")
+        return jsonify({'error': 'Error searching products', 'details': str(e)}), 500
+
+@bp.route('/autocomplete', methods=['GET'])
+def autocomplete_products():
+    try:
+        prefix = request.args.get('q', '')
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': 'Invalid limit value'}), 400
+        
+        autocomplete_index.ensure_current()
+        return jsonify({'query': prefix, 'suggestions': autocomplete_index.suggest(prefix, limit)})
+    except Exception as e:
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in autocomplete_products")
+        return jsonify({'error': 'Error loading suggestions', 'details': str(e)}), 500
+
+@bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(catalog_cache.stats())
+
 @bp.route('/<product_id>', methods=['GET'])
 def get_product(product_id):
     try:
@@ -83,21 +223,34 @@ def get_product(product_id):
         if not ObjectId.is_valid(product_id):
             return jsonify({'error': 'Invalid product ID'}), 400
 
-        product = mongo.db.products.find_one({'_id': ObjectId(product_id)})
+        version = get_product_version(ObjectId(product_id))
+        if version is None:
+            return jsonify({'error': 'Product not found'}), 404
+        
+        try:
+            image_size = parse_image_size(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        etag = make_etag('product', product_id, version, image_size)
+        if request_matches_etag(etag):
+            return not_modified_response(etag)
+        
+        def load_product():
+            product = mongo.db.products.find_one({'_id': ObjectId(product_id)})
+            if not product:
+                return None
+            return serialize_product(product, image_size)
+        
+        product = catalog_cache.get_or_load(('product', product_id, version, image_size), load_product)
         if not product:
             return jsonify({'error': 'Product not found'}), 404
-            
-        product['_id'] = str(product['_id'])
-        # Handle product images
-        if 'images' in product:
-            product['images'] = [get_image_url(img) for img in product['images']]
-        else:
-            product['images'] = ['/static/images/default-product.png']
-        return jsonify(product)
+        return with_etag(jsonify(product), etag)
         
     except Exception as e:
-        print(f"Error in get_product: {str(e)}")
-        print(traceback.format_exc())
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in get_product")
         return jsonify({'error': 'Error loading product', 'details': str(e)}), 500
 
 @bp.route('/', methods=['POST'])
@@ -112,48 +265,34 @@ def add_product():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
             
-        required_fields = ['name', 'price', 'description', 'category', 'stock']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Validate price and stock
         try:
-            price = float(data['price'])
-            stock = int(data['stock'])
-            if price <= 0 or stock < 0:
-                return jsonify({'error': 'Price and stock must be positive numbers'}), 400
-        except ValueError:
-            return jsonify({'error': 'Invalid price or stock value'}), 400
-        
-        # Set default image based on product name if no image provided
-        images = data.get('images', [])
-        if not images:
-            default_image = f"/static/images/{data['name'].replace(' ', '_')}.png"
-            images = [default_image]
-        elif isinstance(images, str):
-            images = [images]
-        
-        product = {
-            'name': data['name'],
-            'price': price,
-            'description': data['description'],
-            'category': data['category'],
-            'stock': stock,
+            product = validate_product(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        images = product['images']
+        
+        product.update({
             'vendor_email': current_user['email'],
             'created_at': datetime.datetime.utcnow(),
-            'images': images
-        }
+            'updated_at': datetime.datetime.utcnow(),
+            'version': 1
+        })
         
-        result = mongo.db.products.insert_one(product)
+        try:
+            result = mongo.db.products.insert_one(product)
+        except DuplicateKeyError:
+            return jsonify({'error': 'You already have a product with this SKU'}), 409
         product['_id'] = str(result.inserted_id)
+        invalidate_catalog_cache(product['_id'])
+        autocomplete_index.upsert(product['_id'], product['name'])
         
-        print(f"Product added with images: {images}")  # Debug print
+        logger.debug("Product added with %d images", len(images))
         return jsonify({'message': 'Product added successfully', 'product': product}), 201
         
     except Exception as e:
-        print(f"Error in add_product: {str(e)}")
-        print(traceback.format_exc())
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in add_product")
         return jsonify({'error': 'Error adding product', 'details': str(e)}), 500
 
 @bp.route('/<product_id>', methods=['PUT'])
@@ -165,55 +304,41 @@ def update_product(product_id):
             return jsonify({'error': 'Invalid product ID'}), 400
 
         current_user = get_jwt_identity()
-        product = mongo.db.products.find_one({'_id': ObjectId(product_id)})
-        
-        if not product:
-            return jsonify({'error': 'Product not found'}), 404
-        
-        if product['vendor_email'] != current_user['email']:
-            return jsonify({'error': 'You can only update your own products'}), 403
-        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
             
-        # Validate price and stock if provided
-        if 'price' in data:
-            try:
-                price = float(data['price'])
-                if price <= 0:
-                    return jsonify({'error': 'Price must be a positive number'}), 400
-            except ValueError:
-                return jsonify({'error': 'Invalid price value'}), 400
-
-        if 'stock' in data:
-            try:
-                stock = int(data['stock'])
-                if stock < 0:
-                    return jsonify({'error': 'Stock must be a non-negative number'}), 400
-            except ValueError:
-                return jsonify({'error': 'Invalid stock value'}), 400
-            
-        update_data = {
-            'name': data.get('name', product['name']),
-            'price': float(data.get('price', product['price'])),
-            'description': data.get('description', product['description']),
-            'category': data.get('category', product['category']),
-            'stock': int(data.get('stock', product['stock'])),
-            'images': data.get('images', product['images'])
-        }
-        
-        mongo.db.products.update_one(
-            {'_id': ObjectId(product_id)},
-            {'$set': update_data}
+        try:
+            update_data = validate_product_update(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not update_data:
+            return jsonify({'error': 'No fields to update'}), 400
+        
+        # Only the fields sent are written, and the vendor check is part of the filter
+        update_data['updated_at'] = datetime.datetime.utcnow()
+        product = mongo.db.products.find_one_and_update(
+            {'_id': ObjectId(product_id), 'vendor_email': current_user['email']},
+            {'$set': update_data, '$inc': {'version': 1}},
+            projection=PRODUCT_UPDATE_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
+        if not product:
+            if mongo.db.products.find_one({'_id': ObjectId(product_id)}, {'_id': 1}):
+                return jsonify({'error': 'You can only update your own products'}), 403
+            return jsonify({'error': 'Product not found'}), 404
         
-        update_data['_id'] = product_id
-        return jsonify({'message': 'Product updated successfully', 'product': update_data}), 200
+        invalidate_catalog_cache(product_id)
+        if 'name' in update_data:
+            autocomplete_index.upsert(product_id, product['name'])
+        
+        product['_id'] = product_id
+        return jsonify({'message': 'Product updated successfully', 'product': product}), 200
         
     except Exception as e:
-        print(f"Error in update_product: {str(e)}")
-        print(traceback.format_exc())
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in update_product")
         return jsonify({'error': 'Error updating product', 'details': str(e)}), 500
 
 @bp.route('/<product_id>', methods=['DELETE'])
@@ -234,13 +359,164 @@ def delete_product(product_id):
             return jsonify({'error': 'You can only delete your own products'}), 403
         
         mongo.db.products.delete_one({'_id': ObjectId(product_id)})
+        invalidate_catalog_cache(product_id)
+        autocomplete_index.remove(product_id)
         return jsonify({'message': 'Product deleted successfully'}), 200
         
     except Exception as e:
-        print(f"Error in delete_product: {str(e)}")
-        print(traceback.format_exc())
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in delete_product")
         return jsonify({'error': 'Error deleting product', 'details': str(e)}), 500
 
+def _batch_error(result, status, message):
+    result.update({'ok': False, 'status': status, 'error': message})
+    return result
+
+@bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_products():
+    """Apply up to MAX_BATCH_OPERATIONS creates, updates and deletes in one bulk write.
+
+    Body: {"operations": [{"op": "create", "product": {...}},
+                          {"op": "update", "id": "...", "fields": {...}},
+                          {"op": "delete", "id": "..."}]}
+    Each operation gets its own result; one bad operation doesn't fail the rest.
+    `unmatched_deletes` counts deletes whose product was already gone by the time of
+    the write (the bulk result doesn't say which ones, so each still reports ok).
+    """
+    try:
+        current_user = get_jwt_identity()
+        if current_user['role'] != 'vendor':
+            return jsonify({'error': 'Only vendors can modify products'}), 403
+        
+        data = request.get_json(silent=True)
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'operations must be a non-empty list'}), 400
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+        
+        # Validate every operation before touching the database
+        results = []
+        pending = []  # (result, operation, product_id, document)
+        seen_ids = set()
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            result = {'index': index, 'op': op}
+            results.append(result)
+            if op not in BATCH_OPERATIONS:
+                _batch_error(result, 400, f"op must be one of: {', '.join(BATCH_OPERATIONS)}")
+                continue
+            try:
+                if op == 'create':
+                    document = validate_product(operation.get('product') or {})
+                    product_id = ObjectId()
+                else:
+                    if not ObjectId.is_valid(operation.get('id')):
+                        raise ValueError('Invalid product ID')
+                    product_id = ObjectId(operation['id'])
+                    if product_id in seen_ids:
+                        raise ValueError('Each product may appear only once per batch')
+                    document = None
+                    if op == 'update':
+                        document = validate_product_update(operation.get('fields') or {})
+                        if not document:
+                            raise ValueError('No fields to update')
+            except ValueError as e:
+                _batch_error(result, 400, str(e))
+                continue
+            result['id'] = str(product_id)
+            seen_ids.add(product_id)
+            pending.append((result, op, product_id, document))
+        
+        # Check ownership of every updated or deleted product with one query
+        existing_ids = [product_id for _, op, product_id, _ in pending if op != 'create']
+        owners = {}
+        if existing_ids:
+            owners = {p['_id']: p.get('vendor_email') for p in mongo.db.products.find(
+                {'_id': {'$in': existing_ids}}, {'vendor_email': 1})}
+        
+        now = datetime.datetime.utcnow()
+        writes = []
+        written = []
+        for result, op, product_id, document in pending:
+            if op != 'create':
+                if product_id not in owners:
+                    _batch_error(result, 404, 'Product not found')
+                    continue
+                if owners[product_id] != current_user['email']:
+                    _batch_error(result, 403, f'You can only {op} your own products')
+                    continue
+            if op == 'create':
+                document.update({'_id': product_id, 'vendor_email': current_user['email'],
+                                 'created_at': now, 'updated_at': now, 'version': 1})
+                writes.append(InsertOne(document))
+            elif op == 'update':
+                document['updated_at'] = now
+                writes.append(UpdateOne({'_id': product_id, 'vendor_email': current_user['email']},
+                                        {'$set': document, '$inc': {'version': 1}}))
+            else:
+                writes.append(DeleteOne({'_id': product_id, 'vendor_email': current_user['email']}))
+            written.append((result, op, product_id, document))
+        
+        failed_writes = {}
+        matched = deleted = 0
+        if writes:
+            try:
+                bulk_result = mongo.db.products.bulk_write(writes, ordered=False)
+                matched, deleted = bulk_result.matched_count, bulk_result.deleted_count
+            except BulkWriteError as e:
+                for error in e.details['writeErrors']:
+                    failed_writes[error['index']] = error
+                matched, deleted = e.details['nMatched'], e.details['nRemoved']
+        
+        # A product deleted (or handed over) since the ownership check matches nothing.
+        # The bulk result only has totals, so on a shortfall updated products are
+        # re-checked. Deleted products are gone either way and can't be told apart, so
+        # a delete shortfall is only reported as a count.
+        applied = [(i, op, product_id) for i, (_, op, product_id, _) in enumerate(written)
+                   if i not in failed_writes]
+        unmatched = set()
+        updated_ids = [product_id for _, op, product_id in applied if op == 'update']
+        if matched < len(updated_ids):
+            still_owned = {p['_id'] for p in mongo.db.products.find(
+                {'_id': {'$in': updated_ids}, 'vendor_email': current_user['email']}, {'_id': 1})}
+            unmatched.update(i for i, op, product_id in applied if op == 'update' and product_id not in still_owned)
+        unmatched_deletes = max(sum(1 for _, op, _ in applied if op == 'delete') - deleted, 0)
+        
+        changed_ids = []
+        for write_index, (result, op, product_id, document) in enumerate(written):
+            error = failed_writes.get(write_index)
+            if error:
+                if error.get('code') == 11000:
+                    _batch_error(result, 409, 'You already have a product with this SKU')
+                else:
+                    _batch_error(result, 500, error.get('errmsg', 'Write failed'))
+                continue
+            if write_index in unmatched:
+                _batch_error(result, 404, 'Product not found')
+                continue
+            result.update({'ok': True, 'status': 201 if op == 'create' else 200})
+            changed_ids.append(product_id)
+            if op == 'delete':
+                autocomplete_index.remove(product_id)
+            elif 'name' in document:
+                autocomplete_index.upsert(product_id, document['name'])
+        
+        if changed_ids:
+            invalidate_catalog_cache(*changed_ids)
+        
+        succeeded = sum(1 for result in results if result.get('ok'))
+        return jsonify({'results': results, 'succeeded': succeeded,
+                        'failed': len(results) - succeeded, 'unmatched_deletes': unmatched_deletes}), 200
+        
+    except Exception as e:
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in batch_products")
+        return jsonify({'error': 'Error applying batch', 'details': str(e)}), 500
+
 @bp.route('/upload-image', methods=['POST'])
 @jwt_required()
 def upload_image():
@@ -253,56 +529,63 @@ def upload_image():
             return jsonify({'error': 'No selected file'}), 400
             
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            # Add timestamp to filename to make it unique
-            filename = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-            
-            # Ensure the images directory exists
-            images_dir = os.path.join(current_app.static_folder, 'images')
-            if not os.path.exists(images_dir):
-                os.makedirs(images_dir)
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            # Name the file by its content so repeat uploads reuse the stored copy
+            filename, is_new = save_upload(file, extension)
             
-            filepath = os.path.join(images_dir, filename)
-            file.save(filepath)
+            # Resized variants are generated in the background; until they exist
+            # serve_image falls back to the original
+            if is_new:
+                schedule_variants(filename)
             
             # Return the URL path to the uploaded image
             image_url = f"/static/images/{filename}"
-            print(f"Image saved successfully at: {image_url}")  # Debug print
-            return jsonify({'image_url': image_url}), 200
+            logger.debug("Image saved at %s", image_url)
+            return jsonify({
+                'image_url': image_url,
+                'variants': {size: get_image_url(image_url, size) for size in IMAGE_SIZES},
+                'deduplicated': not is_new
+            }), 200
             
         return jsonify({'error': 'Invalid file type'}), 400
         
     except Exception as e:
-        print(f"Error uploading image: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error uploading image")
         return jsonify({'error': 'Error uploading image', 'details': str(e)}), 500
 
 @bp.route('/featured', methods=['GET'])
 def get_featured_products():
+    """Products in featured-ranking order (see app.featured); `sort` is ignored."""
     try:
-        # Get featured products (for now, just return all products)
-        products = list(mongo.db.products.find().limit(6))  # Limit to 6 featured products
-        
-        # Convert ObjectId to string and ensure images are properly formatted
-        for product in products:
-            product['_id'] = str(product['_id'])
-            # Ensure product has required fields
-            if 'name' not in product:
-                product['name'] = 'Unnamed Product'
-            if 'description' not in product:
-                product['description'] = 'No description available'
-            if 'price' not in product:
-                product['price'] = 0
-            # Handle images
-            if not product.get('images') or len(product['images']) == 0:
-                product['images'] = ['/static/images/default-product.png']
-            elif isinstance(product['images'], str):
-                product['images'] = [product['images']]
-            
-            print(f"Featured Product {product['name']} using images: {product['images']}")  # Debug print
+        try:
+            after, limit, _ = parse_page_args(request.args, default_limit=FEATURED_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        featured_ranking.ensure_started()
+        if not featured_ranking.ready:
+            # The first ranking is still being computed in the background
+            return jsonify({'products': [], 'next_cursor': None, 'limit': limit}), 200, retry_after_headers()
+        generation, product_ids, next_cursor = featured_ranking.page(after, limit)
+        version = get_catalog_version()
+        etag = make_etag('featured', version, generation, after, limit)
+        if request_matches_etag(etag):
+            return not_modified_response(etag)
+        
+        def load_page():
+            # One _id lookup for the page; the ranking itself is precomputed
+            found = {product['_id']: product for product in mongo.db.products.find(
+                {'_id': {'$in': product_ids}}, PRODUCT_LIST_PROJECTION)}
+            # Products deleted since the last refresh are skipped
+            products = serialize_products([found[product_id] for product_id in product_ids if product_id in found])
+            logger.debug("Loaded %d featured products (after=%s)", len(products), after)
+            return products
+        
+        products = catalog_cache.get_or_load(('featured', version, generation, after, limit), load_page)
         
-        return jsonify(products)
+        return with_etag(jsonify({'products': products, 'next_cursor': next_cursor, 'limit': limit}), etag)
     except Exception as e:
-        print(f"Error in get_featured_products: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': 'Error loading featured products', 'details': str(e)}), 500 
\ No newline at end of file
+        if is_query_timeout(e):
+            return query_timeout_response()
+        logger.exception("Error in get_featured_products")
+        return jsonify({'error': 'Error loading featured products', 'details': str(e)}), 500
@@ -0,0 +1,62 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import mongo
+from app.vendor_stats import vendor_key
+import datetime
+
+bp = Blueprint('vendor', __name__)
+
+DEFAULT_STATS_DAYS = 30
+MAX_STATS_DAYS = 366
+DEFAULT_TOP_PRODUCTS = 10
+
+@bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_vendor_stats():
+    current_user = get_jwt_identity()
+    if current_user['role'] != 'vendor':
+        return jsonify({'error': 'Only vendors can view sales stats'}), 403
+    
+    try:
+        days = min(int(request.args.get('days', DEFAULT_STATS_DAYS)), MAX_STATS_DAYS)
+        top = int(request.args.get('top', DEFAULT_TOP_PRODUCTS))
+        if days < 1 or top < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'days and top must be positive integers'}), 400
+    
+    vendor_email = current_user['email']
+    since = (datetime.datetime.utcnow() - datetime.timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    
+    totals = mongo.db.vendor_stats.find_one({'_id': vendor_key(vendor_email)}, {'_id': 0, 'kind': 0}) or {}
+    daily = list(mongo.db.vendor_stats.find(
+        {'vendor_email': vendor_email, 'kind': 'day', 'date': {'$gte': since}},
+        {'_id': 0, 'date': 1, 'orders': 1, 'units': 1, 'revenue': 1}
+    ).sort('date', 1))
+    top_products = list(mongo.db.vendor_stats.find(
+        {'vendor_email': vendor_email, 'kind': 'product'},
+        {'_id': 0, 'product_id': 1, 'name': 1, 'orders': 1, 'units': 1, 'revenue': 1}
+    ).sort('revenue', -1).limit(top))
+    
+    # Current stock comes straight from products; it isn't a rollup
+    stock = next(mongo.db.products.aggregate([
+        {'$match': {'vendor_email': vendor_email}},
+        {'$group': {
+            '_id': None,
+            'products': {'$sum': 1},
+            'units': {'$sum': '$stock'},
+            'out_of_stock': {'$sum': {'$cond': [{'$gt': ['$stock', 0]}, 0, 1]}}
+        }},
+        {'$project': {'_id': 0}}
+    ]), {'products': 0, 'units': 0, 'out_of_stock': 0})
+    
+    return jsonify({
+        'vendor_email': vendor_email,
+        'orders': totals.get('orders', 0),
+        'units': totals.get('units', 0),
+        'revenue': round(totals.get('revenue', 0), 2),
+        'status_counts': totals.get('status_counts', {}),
+        'daily': daily,
+        'top_products': top_products,
+        'stock': stock
+    }), 200
@@ -0,0 +1,135 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from app import app, mongo
+from app.catalog import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+app.config['AUTOCOMPLETE_REBUILD_INTERVAL'] = float(os.getenv('AUTOCOMPLETE_REBUILD_INTERVAL', 60))
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 25
+
+def _name_keys(name):
+    """Return the lowercased name starting at each word, so any word can be a prefix."""
+    words = name.lower().split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+class PrefixIndex:
+    """In-process sorted index of product names for prefix autocomplete.
+
+    Lookups are a binary search over a sorted key list, so latency depends on the
+    number of suggestions returned, not on catalog size. The index is rebuilt from
+    `products` in the background when the catalog version changes (at most once per
+    AUTOCOMPLETE_REBUILD_INTERVAL seconds), and product write routes patch it directly
+    so a vendor's own edits show up right away. The first build runs in the background
+    too, and suggestions are empty until it finishes.
+    """
+
+    def __init__(self, rebuild_interval=60):
+        self.rebuild_interval = rebuild_interval
+        self._keys = []      # sorted lowercased name suffixes
+        self._entries = []   # (product_id, name) parallel to _keys
+        self._by_product = {}  # product_id -> keys, for updates and removals
+        self._lock = threading.Lock()
+        self._built_version = None
+        self._last_build = 0.0
+        self._building = False
+
+    def _build(self, version):
+        keys = []
+        by_product = {}
+        # Read the primary like the version, so _built_version never runs ahead of the names
+        for product in mongo.db.products.find({}, {'name': 1}):
+            name = product.get('name')
+            if not name:
+                continue
+            product_id = str(product['_id'])
+            product_keys = _name_keys(name)
+            by_product[product_id] = product_keys
+            keys.extend((key, product_id, name) for key in product_keys)
+        keys.sort()
+        with self._lock:
+            self._keys = [k[0] for k in keys]
+            self._entries = [(k[1], k[2]) for k in keys]
+            self._by_product = by_product
+            self._built_version = version
+
+    @property
+    def ready(self):
+        return self._built_version is not None
+
+    def _background_build(self, version):
+        try:
+            self._build(version)
+        except Exception as e:
+            logger.exception("Error rebuilding autocomplete index")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def ensure_current(self):
+        """Start a background build on first use, or when the catalog has changed.
+
+        One build runs at a time, on its own thread, so it isn't held to the
+        request's query budget. A first build that failed is retried by the next
+        request rather than after AUTOCOMPLETE_REBUILD_INTERVAL.
+        """
+        version = get_catalog_version()
+        with self._lock:
+            if self._building or version == self._built_version:
+                return
+            if self.ready and time.monotonic() - self._last_build < self.rebuild_interval:
+                return
+            self._building = True
+            self._last_build = time.monotonic()
+        threading.Thread(target=self._background_build, args=(version,), daemon=True).start()
+
+    def suggest(self, prefix, limit=DEFAULT_SUGGESTIONS):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        suggestions = []
+        seen = set()
+        with self._lock:
+            i = bisect.bisect_left(self._keys, prefix)
+            while i < len(self._keys) and self._keys[i].startswith(prefix) and len(suggestions) < limit:
+                product_id, name = self._entries[i]
+                if product_id not in seen:
+                    seen.add(product_id)
+                    suggestions.append({'_id': product_id, 'name': name})
+                i += 1
+        return suggestions
+
+    def _remove_locked(self, product_id):
+        for key in self._by_product.pop(product_id, []):
+            i = bisect.bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._entries[i][0] == product_id:
+                    del self._keys[i]
+                    del self._entries[i]
+                    break
+                i += 1
+
+    def upsert(self, product_id, name):
+        product_id = str(product_id)
+        with self._lock:
+            if self._built_version is None:
+                return
+            self._remove_locked(product_id)
+            if not name:
+                return
+            product_keys = _name_keys(name)
+            self._by_product[product_id] = product_keys
+            for key in product_keys:
+                i = bisect.bisect_right(self._keys, key)
+                self._keys.insert(i, key)
+                self._entries.insert(i, (product_id, name))
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove_locked(str(product_id))
+
+autocomplete_index = PrefixIndex(rebuild_interval=app.config['AUTOCOMPLETE_REBUILD_INTERVAL'])
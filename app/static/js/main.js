@@ -172,15 +172,21 @@ async function handleRegister(e) {
 }
 
 // Product Functions
-async function loadProducts() {
+// Without `after` the grid starts over; with it the next page is appended
+async function loadProducts(after = null) {
     try {
-        const response = await fetch('/api/products');
+        const url = after ? `/api/products?after=${encodeURIComponent(after)}` : '/api/products';
+        const response = await fetch(url, {
+            headers: {
+                'Accept': 'application/json'
+            }
+        });
         if (!response.ok) {
             throw new Error('Failed to load products');
         }
-        const products = await response.json();
-        console.log('Loaded products:', products); // Debug log
-        displayProducts(products);
+        const data = await response.json();
+        displayProducts(data.products, Boolean(after));
+        updateLoadMoreButton(data.next_cursor);
     } catch (error) {
         console.error('Error loading products:', error);
         document.getElementById('products-container').innerHTML = 
@@ -188,10 +194,27 @@ async function loadProducts() {
     }
 }
 
-function displayProducts(products) {
+function updateLoadMoreButton(nextCursor) {
+    const productsContainer = document.getElementById('products-container');
+    let loadMore = document.getElementById('load-more-products');
+    if (!loadMore) {
+        loadMore = document.createElement('div');
+        loadMore.id = 'load-more-products';
+        loadMore.className = 'text-center mb-4';
+        loadMore.innerHTML = '<button type="button" class="btn btn-outline-primary">Load More</button>';
+        productsContainer.after(loadMore);
+    }
+    loadMore.classList.toggle('d-none', !nextCursor);
+    loadMore.querySelector('button').onclick = () => loadProducts(nextCursor);
+}
+
+function displayProducts(products, append = false) {
     const productsContainer = document.getElementById('products-container');
     console.log('Displaying products:', products); // Debug log
     
+    if (append && (!products || products.length === 0)) {
+        return;
+    }
     if (!products || products.length === 0) {
         productsContainer.innerHTML = '<div class="col-12"><p class="text-center">No products available</p></div>';
         return;
@@ -200,7 +223,7 @@ function displayProducts(products) {
     // Create a data URL for a simple placeholder image
     const placeholderImage = 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgZmlsbD0iI2VlZSIvPjx0ZXh0IHg9IjUwJSIgeT0iNTAlIiBmb250LWZhbWlseT0iQXJpYWwiIGZvbnQtc2l6ZT0iMTQiIGZpbGw9IiM5OTkiIHRleHQtYW5jaG9yPSJtaWRkbGUiIGR5PSIuM2VtIj5ObyBJbWFnZTwvdGV4dD48L3N2Zz4=';
 
-    productsContainer.innerHTML = products.map(product => {
+    const cards = products.map(product => {
         console.log(`Product ${product.name} images:`, product.images); // Debug log
         
         // Get the first image URL or use placeholder
@@ -238,6 +261,11 @@ function displayProducts(products) {
             </div>
         `;
     }).join('');
+    if (append) {
+        productsContainer.insertAdjacentHTML('beforeend', cards);
+    } else {
+        productsContainer.innerHTML = cards;
+    }
 }
 
 // Cart Functions
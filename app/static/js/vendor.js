@@ -12,6 +12,7 @@ const productForm = document.getElementById('productForm');
 document.addEventListener('DOMContentLoaded', () => {
     checkAuthStatus();
     loadVendorProducts();
+    loadVendorStats();
     productModal = new bootstrap.Modal(document.getElementById('productModal'));
 });
 
@@ -42,21 +43,56 @@ function checkAuthStatus() {
     }
 }
 
-// Product Functions
-async function loadVendorProducts() {
+// Stats Functions
+async function loadVendorStats() {
     try {
-        const response = await fetch(`${API_BASE_URL}/products`, {
+        const response = await fetch(`${API_BASE_URL}/vendor/stats`, {
             headers: {
                 'Authorization': `Bearer ${localStorage.getItem('token')}`
             }
         });
         
         if (!response.ok) {
-            throw new Error('Failed to load products');
+            throw new Error('Failed to load stats');
         }
         
-        const products = await response.json();
-        displayVendorProducts(products.filter(p => p.vendor_email === currentUser.email));
+        const stats = await response.json();
+        document.getElementById('stats-orders').textContent = stats.orders;
+        document.getElementById('stats-units').textContent = stats.units;
+        document.getElementById('stats-revenue').textContent = `$${stats.revenue.toFixed(2)}`;
+        document.getElementById('stats-stock').textContent = `${stats.stock.units} / ${stats.stock.out_of_stock}`;
+    } catch (error) {
+        console.error('Error loading stats:', error);
+    }
+}
+
+// Product Functions
+async function loadVendorProducts() {
+    try {
+        // Walk the vendor's pages using the cursor returned with each page
+        let products = [];
+        let cursor = null;
+        do {
+            let url = `${API_BASE_URL}/products?vendor_email=${encodeURIComponent(currentUser.email)}&limit=100`;
+            if (cursor) {
+                url += `&after=${cursor}`;
+            }
+            const response = await fetch(url, {
+                headers: {
+                    'Accept': 'application/json',
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`
+                }
+            });
+            
+            if (!response.ok) {
+                throw new Error('Failed to load products');
+            }
+            
+            const data = await response.json();
+            products = products.concat(data.products);
+            cursor = data.next_cursor;
+        } while (cursor);
+        displayVendorProducts(products);
     } catch (error) {
         console.error('Error loading products:', error);
         showAlert('Error loading products', 'danger');
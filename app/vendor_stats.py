@@ -0,0 +1,165 @@
+from pymongo import UpdateOne
+from app import mongo
+
+# vendor_stats holds three kinds of counter documents per vendor:
+#   vendor:<email>                 orders, units, revenue and per-status order counts
+#   product:<email>:<product_id>   orders, units and revenue for one product
+#   day:<email>:<YYYY-MM-DD>       orders, units and revenue for one UTC day
+# Units and revenue exclude cancelled orders. Revenue is item price * quantity,
+# before any coupon discount on the order total.
+
+CANCELLED = 'cancelled'
+# Statuses become counter field names (status_counts.<status>), so only these are accepted
+ORDER_STATUSES = ('pending', 'processing', 'shipped', 'delivered', CANCELLED)
+
+def vendor_key(vendor_email):
+    return f'vendor:{vendor_email}'
+
+def product_key(vendor_email, product_id):
+    return f'product:{vendor_email}:{product_id}'
+
+def day_key(vendor_email, day):
+    return f'day:{vendor_email}:{day}'
+
+def _vendor_lines(order):
+    """Group an order's items by vendor as {vendor: [items]}."""
+    lines = {}
+    for item in order.get('items', []):
+        if item.get('vendor_email'):
+            lines.setdefault(item['vendor_email'], []).append(item)
+    return lines
+
+def _counter_updates(order, sign, order_count, status_inc):
+    """Build the $inc upserts that apply `sign` times this order's units and revenue."""
+    day = order['created_at'].strftime('%Y-%m-%d')
+    updates = []
+    for vendor_email, items in _vendor_lines(order).items():
+        units = sum(item['quantity'] for item in items) * sign
+        revenue = sum(item['price'] * item['quantity'] for item in items) * sign
+
+        vendor_inc = {'orders': order_count, 'units': units, 'revenue': revenue}
+        for status, delta in status_inc.items():
+            vendor_inc[f'status_counts.{status}'] = delta
+        updates.append(UpdateOne(
+            {'_id': vendor_key(vendor_email)},
+            {'$inc': vendor_inc, '$setOnInsert': {'kind': 'vendor', 'vendor_email': vendor_email}},
+            upsert=True
+        ))
+        if sign == 0 and order_count == 0:
+            # Pure status moves only touch the vendor's status counters
+            continue
+        updates.append(UpdateOne(
+            {'_id': day_key(vendor_email, day)},
+            {'$inc': {'orders': order_count, 'units': units, 'revenue': revenue},
+             '$setOnInsert': {'kind': 'day', 'vendor_email': vendor_email, 'date': day}},
+            upsert=True
+        ))
+        for item in items:
+            product_id = str(item['product_id'])
+            updates.append(UpdateOne(
+                {'_id': product_key(vendor_email, product_id)},
+                {'$inc': {'orders': order_count, 'units': item['quantity'] * sign,
+                          'revenue': item['price'] * item['quantity'] * sign},
+                 '$set': {'name': item.get('name')},
+                 '$setOnInsert': {'kind': 'product', 'vendor_email': vendor_email, 'product_id': product_id}},
+                upsert=True
+            ))
+    return updates
+
+def record_order(order):
+    """Count a newly created order for every vendor it contains."""
+    updates = _counter_updates(order, 1, 1, {order['status']: 1})
+    if updates:
+        mongo.db.vendor_stats.bulk_write(updates, ordered=False)
+
+def record_status_change(order, old_status, new_status):
+    """Move the order between status counters, dropping or restoring it on cancellation."""
+    if old_status == new_status:
+        return
+    status_inc = {new_status: 1}
+    if old_status:
+        status_inc[old_status] = -1
+    sign = 0
+    if new_status == CANCELLED:
+        sign = -1
+    elif old_status == CANCELLED:
+        sign = 1
+    updates = _counter_updates(order, sign, 0, status_inc)
+    if updates:
+        mongo.db.vendor_stats.bulk_write(updates, ordered=False)
+
+def rebuild_pipeline(output_collection='vendor_stats'):
+    """Aggregation that recomputes every vendor_stats document from orders."""
+    counted = {'$ne': ['$status', CANCELLED]}
+    return [
+        {'$unwind': '$items'},
+        {'$match': {'items.vendor_email': {'$type': 'string'}}},
+        # One row per (order, vendor) with that vendor's share of the order
+        {'$group': {
+            '_id': {'order': '$_id', 'vendor': '$items.vendor_email'},
+            'status': {'$first': '$status'},
+            'day': {'$first': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}},
+            'units': {'$sum': {'$cond': [counted, '$items.quantity', 0]}},
+            'revenue': {'$sum': {'$cond': [counted, {'$multiply': ['$items.price', '$items.quantity']}, 0]}},
+            'products': {'$push': {
+                'product_id': {'$toString': '$items.product_id'},
+                'name': '$items.name',
+                'units': {'$cond': [counted, '$items.quantity', 0]},
+                'revenue': {'$cond': [counted, {'$multiply': ['$items.price', '$items.quantity']}, 0]}
+            }}
+        }},
+        # Fan each row out into its contributions to vendor, day and product counters
+        {'$project': {'_id': 0, 'contributions': {'$concatArrays': [
+            [{
+                'key': {'$concat': ['vendor:', '$_id.vendor']}, 'kind': 'vendor',
+                'vendor_email': '$_id.vendor', 'status': '$status',
+                'units': '$units', 'revenue': '$revenue'
+            }, {
+                'key': {'$concat': ['day:', '$_id.vendor', ':', '$day']}, 'kind': 'day',
+                'vendor_email': '$_id.vendor', 'date': '$day',
+                'units': '$units', 'revenue': '$revenue'
+            }],
+            {'$map': {'input': '$products', 'as': 'p', 'in': {
+                'key': {'$concat': ['product:', '$_id.vendor', ':', '$$p.product_id']}, 'kind': 'product',
+                'vendor_email': '$_id.vendor', 'product_id': '$$p.product_id', 'name': '$$p.name',
+                'units': '$$p.units', 'revenue': '$$p.revenue'
+            }}}
+        ]}}},
+        {'$unwind': '$contributions'},
+        {'$replaceRoot': {'newRoot': '$contributions'}},
+        {'$group': {
+            '_id': {'key': '$key', 'status': '$status'},
+            'kind': {'$first': '$kind'},
+            'vendor_email': {'$first': '$vendor_email'},
+            'date': {'$first': '$date'},
+            'product_id': {'$first': '$product_id'},
+            'name': {'$last': '$name'},
+            'orders': {'$sum': 1},
+            'units': {'$sum': '$units'},
+            'revenue': {'$sum': '$revenue'}
+        }},
+        {'$group': {
+            '_id': '$_id.key',
+            'kind': {'$first': '$kind'},
+            'vendor_email': {'$first': '$vendor_email'},
+            'date': {'$first': '$date'},
+            'product_id': {'$first': '$product_id'},
+            'name': {'$last': '$name'},
+            'orders': {'$sum': '$orders'},
+            'units': {'$sum': '$units'},
+            'revenue': {'$sum': '$revenue'},
+            'status_counts': {'$push': {'k': '$_id.status', 'v': '$orders'}}
+        }},
+        {'$addFields': {'status_counts': {'$arrayToObject': {'$filter': {
+            'input': '$status_counts', 'as': 's', 'cond': {'$eq': [{'$type': '$$s.k'}, 'string']}
+        }}}}},
+        {'$out': output_collection}
+    ]
+
+def rebuild_vendor_stats():
+    """Recompute vendor_stats from orders in one server-side aggregation.
+
+    $out replaces the collection atomically and keeps its indexes.
+    """
+    list(mongo.db.orders.aggregate(rebuild_pipeline(), allowDiskUse=True))
+    return mongo.db.vendor_stats.estimated_document_count()
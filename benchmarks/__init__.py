@@ -0,0 +1,4 @@
+"""Endpoint benchmarks: seed synthetic data, drive the app, report latency percentiles.
+
+Run with `python -m benchmarks.run --help`.
+"""
@@ -0,0 +1,256 @@
+"""Seed a benchmark database, drive the app and report per-endpoint latency as JSON.
+
+In-process, against the Flask test client (no server needed):
+
+    python -m benchmarks.run --backend mongomock
+    python -m benchmarks.run --backend mongod --mongo-uri mongodb://localhost:27017/mve_bench
+
+Over HTTP, against a server already running on the same database:
+
+    python -m benchmarks.run --backend mongod --base-url http://localhost:5001
+
+Compare two commits by saving each run with --output and diffing the JSON.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.seed import (BENCH_PASSWORD, CATEGORIES, DEFAULT_VOLUMES, customer_email,
+                             vendor_email, seed_database)
+
+SCENARIOS = ('auth.login', 'products.list', 'products.list_category', 'products.detail',
+             'cart.get', 'cart.add', 'orders.list', 'orders.vendor_list')
+TOKEN_POOL_SIZE = 20
+
+class TestClientDriver:
+    """Sends requests through the app's test client, one client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpDriver:
+    """Sends real HTTP requests to a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, headers=None, body=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+def load_app(backend, mongo_uri):
+    """Import the app against the chosen backend and return (app, db)."""
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if backend == 'mongomock':
+        import mongomock
+        # Indexes (text indexes in particular) aren't supported by the stand-in
+        os.environ['MONGO_ENSURE_INDEXES'] = 'false'
+        from app import app, mongo
+        client = mongomock.MongoClient()
+        mongo.cx = client
+        mongo.db = client.get_database('mve_bench')
+    else:
+        os.environ['MONGODB_URI'] = mongo_uri
+        from app import create_app, mongo
+        app = create_app()
+    return app, mongo.db
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def login(driver, email):
+    status, body = driver.request('POST', '/api/auth/login', body={'email': email, 'password': BENCH_PASSWORD})
+    if status != 200:
+        raise RuntimeError(f'Login failed for {email}: {status} {body}')
+    return body['access_token']
+
+class Workload:
+    """Builds the request for each scenario from the seeded volumes."""
+
+    def __init__(self, driver, volumes, seed):
+        self.driver = driver
+        self.volumes = volumes
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        customers = min(volumes['customers'], TOKEN_POOL_SIZE)
+        vendors = min(volumes['vendors'], TOKEN_POOL_SIZE)
+        self.customer_tokens = [login(driver, customer_email(i)) for i in range(customers)]
+        self.vendor_tokens = [login(driver, vendor_email(i)) for i in range(vendors)]
+
+    def _choice(self, values):
+        with self._rng_lock:
+            return self.rng.choice(values)
+
+    def _randrange(self, stop):
+        with self._rng_lock:
+            return self.rng.randrange(stop)
+
+    def _product_id(self):
+        # Matches the fixed ids written by seed_database
+        return f'{self._randrange(self.volumes["products"]) + 1:024x}'
+
+    def _auth(self, tokens):
+        return {'Accept': 'application/json', 'Authorization': f'Bearer {self._choice(tokens)}'}
+
+    def build(self, scenario):
+        """Return (method, path, headers, body) for one request of the scenario."""
+        json_headers = {'Accept': 'application/json'}
+        if scenario == 'auth.login':
+            email = customer_email(self._randrange(self.volumes['customers']))
+            return 'POST', '/api/auth/login', json_headers, {'email': email, 'password': BENCH_PASSWORD}
+        if scenario == 'products.list':
+            return 'GET', '/api/products/?limit=24', json_headers, None
+        if scenario == 'products.list_category':
+            return 'GET', f'/api/products/?limit=24&category={self._choice(CATEGORIES)}', json_headers, None
+        if scenario == 'products.detail':
+            return 'GET', f'/api/products/{self._product_id()}', json_headers, None
+        if scenario == 'cart.get':
+            return 'GET', '/api/cart/', self._auth(self.customer_tokens), None
+        if scenario == 'cart.add':
+            return 'POST', '/api/cart/', self._auth(self.customer_tokens), {'product_id': self._product_id(),
+                                                                           'quantity': 1}
+        if scenario == 'orders.list':
+            return 'GET', '/api/orders/', self._auth(self.customer_tokens), None
+        if scenario == 'orders.vendor_list':
+            return 'GET', '/api/orders/', self._auth(self.vendor_tokens), None
+        raise ValueError(f'Unknown scenario: {scenario}')
+
+def run_scenario(driver, workload, scenario, requests, warmup, concurrency):
+    def timed_request(_):
+        method, path, headers, body = workload.build(scenario)
+        started = time.perf_counter()
+        status, _ = driver.request(method, path, headers=headers, body=body)
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed_request, range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(timed_request, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, status in results if status >= 400),
+        'statuses': statuses,
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 50), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 3) if latencies else None,
+        'max_ms': round(latencies[-1], 3) if latencies else None
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('mongomock', 'mongod'), default='mongomock')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/mve_bench')
+    parser.add_argument('--base-url', help='benchmark a running server over HTTP instead of the test client')
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--seed', type=int, default=42)
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{name}', type=int, default=default, help=f'number of {name} to seed')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f'comma-separated subset of: {", ".join(SCENARIOS)}')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.base_url and args.backend == 'mongomock' and not args.no_seed:
+        parser.error('--base-url needs --backend mongod (or --no-seed) so the server sees the seeded data')
+    unknown = set(args.scenarios.split(',')) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    volumes = {name: getattr(args, name) for name in DEFAULT_VOLUMES}
+
+    if args.base_url and args.no_seed:
+        db = None
+    else:
+        app, db = load_app(args.backend, args.mongo_uri)
+    if db is not None and not args.no_seed:
+        started = time.perf_counter()
+        seed_database(db, volumes, seed=args.seed)
+        print(f'Seeded {volumes} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    driver = HttpDriver(args.base_url) if args.base_url else TestClientDriver(app)
+    workload = Workload(driver, volumes, args.seed)
+    endpoints = {}
+    for scenario in args.scenarios.split(','):
+        endpoints[scenario] = run_scenario(driver, workload, scenario, args.requests, args.warmup,
+                                           args.concurrency)
+        print(f'{scenario}: p50 {endpoints[scenario]["p50_ms"]} ms, '
+              f'p99 {endpoints[scenario]["p99_ms"]} ms', file=sys.stderr)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'backend': args.backend,
+        'driver': 'http' if args.base_url else 'test_client',
+        'volumes': volumes,
+        'seed': args.seed,
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'concurrency': args.concurrency,
+        'endpoints': endpoints
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
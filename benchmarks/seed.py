@@ -0,0 +1,118 @@
+"""Deterministic synthetic data for benchmarks.
+
+Every collection is generated from a seeded RNG, so the same volumes and seed always
+produce the same database and results stay comparable across commits.
+"""
+import datetime
+import random
+from bson import ObjectId
+from werkzeug.security import generate_password_hash
+
+BENCH_PASSWORD = 'bench-password'
+CATEGORIES = ['Electronics', 'Clothing', 'Books', 'Home']
+ADJECTIVES = ['Premium', 'Smart', 'Organic', 'Classic', 'Compact', 'Portable', 'Deluxe', 'Eco']
+NOUNS = ['Headphones', 'Watch', 'T-Shirt', 'Messenger Bag', 'Chef Knife', 'Lamp', 'Novel', 'Backpack']
+ORDER_STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+
+DEFAULT_VOLUMES = {
+    'vendors': 20,
+    'customers': 200,
+    'products': 2000,
+    'carts': 200,
+    'orders': 1000,
+    'coupons': 50
+}
+
+def vendor_email(i):
+    return f'vendor{i}@bench.local'
+
+def customer_email(i):
+    return f'customer{i}@bench.local'
+
+def _insert(collection, docs, batch_size=1000):
+    for start in range(0, len(docs), batch_size):
+        collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+def seed_database(db, volumes=None, seed=42):
+    """Drop and regenerate every benchmark collection; returns the volumes used."""
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    rng = random.Random(seed)
+    now = datetime.datetime(2024, 1, 1)
+
+    for name in ('users', 'products', 'carts', 'orders', 'coupons', 'catalog_meta', 'vendor_stats'):
+        db[name].delete_many({})
+
+    # Hashing is deliberately slow, so every user shares one hash of BENCH_PASSWORD
+    password = generate_password_hash(BENCH_PASSWORD)
+    users = [{'email': vendor_email(i), 'password': password, 'role': 'vendor', 'created_at': now}
+             for i in range(volumes['vendors'])]
+    users += [{'email': customer_email(i), 'password': password, 'role': 'customer', 'created_at': now}
+              for i in range(volumes['customers'])]
+    _insert(db.users, users)
+
+    products = []
+    for i in range(volumes['products']):
+        created_at = now + datetime.timedelta(minutes=i)
+        products.append({
+            # Fixed ids keep keyset cursors identical from run to run
+            '_id': ObjectId(f'{i + 1:024x}'),
+            'name': f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+            'description': f'Synthetic benchmark product number {i}',
+            'price': round(rng.uniform(5, 500), 2),
+            'stock': rng.randint(1, 500),
+            'category': rng.choice(CATEGORIES),
+            'vendor_email': vendor_email(rng.randrange(volumes['vendors'])),
+            'images': [f'/static/images/bench-{i % 50}.png'],
+            'created_at': created_at,
+            'updated_at': created_at,
+            'version': 1
+        })
+    _insert(db.products, products)
+    db.catalog_meta.insert_one({'_id': 'products', 'version': 1, 'updated_at': now})
+
+    def pick_items(max_items):
+        items = []
+        for product in rng.sample(products, rng.randint(1, max_items)):
+            items.append({'product': product, 'quantity': rng.randint(1, 3)})
+        return items
+
+    carts = []
+    for i in range(min(volumes['carts'], volumes['customers'])):
+        carts.append({
+            'user_email': customer_email(i),
+            'items': [{'product_id': item['product']['_id'], 'quantity': item['quantity']}
+                      for item in pick_items(5)],
+            'created_at': now,
+            'updated_at': now
+        })
+    _insert(db.carts, carts)
+
+    orders = []
+    for i in range(volumes['orders']):
+        items = [{
+            'product_id': item['product']['_id'],
+            'quantity': item['quantity'],
+            'name': item['product']['name'],
+            'price': item['product']['price'],
+            'vendor_email': item['product']['vendor_email']
+        } for item in pick_items(4)]
+        orders.append({
+            '_id': ObjectId(f'{i + 1:024x}'),
+            'user_email': customer_email(rng.randrange(volumes['customers'])),
+            'items': items,
+            'vendor_emails': sorted({item['vendor_email'] for item in items}),
+            'total_amount': round(sum(item['price'] * item['quantity'] for item in items), 2),
+            'status': rng.choice(ORDER_STATUSES),
+            'created_at': now + datetime.timedelta(minutes=rng.randrange(60 * 24 * 90)),
+            'shipping_address': f'{i} Benchmark Street'
+        })
+    _insert(db.orders, orders)
+
+    coupons = [{
+        'code': f'BENCH{i:04d}',
+        'discount_percentage': rng.choice([5, 10, 15, 20]),
+        'valid_until': now + datetime.timedelta(days=3650)
+    } for i in range(volumes['coupons'])]
+    _insert(db.coupons, coupons)
+
+    return volumes
@@ -0,0 +1,105 @@
+"""Measure the cost of turning product documents into a JSON response body.
+
+Builds synthetic product documents shaped like the seeded catalog, then times
+serialize_products and the JSON encoding separately, with the stdlib provider
+and with the app's provider (orjson when installed):
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --products 10000 --repeat 20 --image-size card
+"""
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import time
+
+from bson import ObjectId
+
+from benchmarks.seed import ADJECTIVES, CATEGORIES, NOUNS
+
+def make_products(count, seed=42):
+    rng = random.Random(seed)
+    now = datetime.datetime(2024, 1, 1)
+    return [{
+        '_id': ObjectId(f'{i + 1:024x}'),
+        'name': f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+        'description': f'Synthetic benchmark product number {i}',
+        'price': round(rng.uniform(5, 500), 2),
+        'stock': rng.randint(1, 500),
+        'category': rng.choice(CATEGORIES),
+        'vendor_email': f'vendor{rng.randrange(20)}@bench.local',
+        'images': [f'/static/images/bench-{i % 50}.png', f'uploads/bench {i % 7}.png'],
+        'created_at': now + datetime.timedelta(minutes=i),
+        'updated_at': now + datetime.timedelta(minutes=i),
+        'version': 1
+    } for i in range(count)]
+
+def time_ms(fn, repeat):
+    """Median wall time of fn() in milliseconds over `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per measurement (median is reported)')
+    parser.add_argument('--image-size', help='serialize with resized image URLs, as ?image_size= does')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['MONGO_ENSURE_INDEXES'] = 'false'
+    from flask.json.provider import DefaultJSONProvider
+    from app import app
+    from app.json_provider import MongoJSONProvider, orjson
+    from app.products import serialize_products
+
+    documents = make_products(args.products)
+    with app.test_request_context():
+        serialized = serialize_products(copy.deepcopy(documents), args.image_size)
+
+        def serialize():
+            # The copy is timed separately below and subtracted
+            serialize_products(copy.deepcopy(documents), args.image_size)
+
+        copy_ms = time_ms(lambda: copy.deepcopy(documents), args.repeat)
+        serialize_ms = round(max(time_ms(serialize, args.repeat) - copy_ms, 0), 3)
+
+        # DefaultJSONProvider can't encode datetimes as ISO; give it the provider's default
+        stdlib = DefaultJSONProvider(app)
+        stdlib.default = MongoJSONProvider.default
+        providers = {'stdlib': stdlib}
+        if orjson is not None:
+            providers['orjson'] = MongoJSONProvider(app)
+
+        encoders = {}
+        for name, provider in providers.items():
+            body = provider.response({'products': serialized}).get_data()
+            encoders[name] = {
+                'response_ms': time_ms(lambda: provider.response({'products': serialized}), args.repeat),
+                'body_bytes': len(body)
+            }
+
+    report = {
+        'python': platform.python_version(),
+        'products': args.products,
+        'repeat': args.repeat,
+        'image_size': args.image_size,
+        'serialize_products_ms': serialize_ms,
+        'encoders': encoders
+    }
+    if 'orjson' in encoders:
+        report['speedup'] = round(encoders['stdlib']['response_ms'] / encoders['orjson']['response_ms'], 2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
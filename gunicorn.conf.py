@@ -0,0 +1,27 @@
+"""Production server settings: gunicorn -c gunicorn.conf.py
+
+Every setting can be overridden from the environment. The app is preloaded in the
+master so workers fork with templates, assets and indexes already in place; each
+worker then opens its own Mongo connection pool on first use.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:application'
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', 5001)}")
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threaded workers: requests mostly wait on Mongo, so threads overlap that I/O
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 4))
+preload_app = os.getenv('PRELOAD_APP', 'true').lower() == 'true'
+timeout = int(os.getenv('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+# Recycle workers now and then so slow leaks can't build up
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 1000))
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+
+# Each worker has its own Mongo pool: one connection per request thread, plus a few for
+# background refreshes (cache, featured ranking, autocomplete). MONGO_MAX_POOL_SIZE wins if set.
+os.environ.setdefault('MONGO_MAX_POOL_SIZE', str(threads + 4))